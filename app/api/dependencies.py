@@ -1,4 +1,9 @@
-from fastapi import Depends, HTTPException, status
+import csv
+import io
+from typing import List, Optional
+
+import orjson
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt, ExpiredSignatureError
 from jose.exceptions import JWTClaimsError
@@ -8,6 +13,7 @@ from app.core.logger import get_logger
 from app.db.session import SessionLocal
 from app.core.security import TokenData
 from app.models.user import User, RoleEnum
+from app.crud.user import get_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
@@ -43,7 +49,7 @@ def get_current_user(
         )
         user_id: int = payload.get("sub")
         if user_id is None:
-            logger.warning("Token payload does not contain 'sub'.")
+            logger.warning("Token payload does not contain 'sub'.", extra={"event": "auth.missing_sub"})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token payload invalid: missing user identifier.",
@@ -51,21 +57,21 @@ def get_current_user(
             )
         token_data = TokenData(user_id=user_id)
     except ExpiredSignatureError:
-        logger.warning("Token has expired.")
+        logger.warning("Token has expired.", extra={"event": "auth.token_expired"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired.",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except JWTClaimsError:
-        logger.error("Token claims error.")
+        logger.warning("Token claims error.", extra={"event": "auth.invalid_claims"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token claims invalid.",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except JWTError as e:
-        logger.error(f"JWT decoding error: {e}")
+        logger.warning(f"JWT decoding error: {e}", extra={"event": "auth.invalid_token"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is invalid.",
@@ -78,9 +84,9 @@ def get_current_user(
             detail="Internal server error.",
         )
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = get_user(db, user_id=token_data.user_id)
     if user is None:
-        logger.warning(f"User not found for user_id: {token_data.user_id}")
+        logger.warning(f"User not found for user_id: {token_data.user_id}", extra={"event": "auth.unknown_user"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found.",
@@ -89,6 +95,53 @@ def get_current_user(
     return user
 
 
+def parse_fields(fields: Optional[str], allowed) -> Optional[List[str]]:
+    """
+    Split a comma-separated `fields=` projection and check it against the
+    allowed field names. None or empty means all fields.
+    """
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return requested
+
+
+async def read_bulk_rows(request: Request) -> list:
+    """
+    Rows of a bulk import: a JSON array of objects, a CSV body (text/csv) or
+    a CSV file uploaded as multipart form field `file`. CSV needs a header row.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a CSV file in form field 'file'")
+        body = await upload.read()
+        content_type = "text/csv"
+    else:
+        body = await request.body()
+
+    if content_type.startswith("text/csv"):
+        try:
+            return list(csv.DictReader(io.StringIO(body.decode("utf-8-sig"))))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid CSV: {str(e)}")
+    try:
+        rows = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of objects")
+    return rows
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     # Implement additional checks like is_active if needed
     return current_user
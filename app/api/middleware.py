@@ -0,0 +1,118 @@
+import uuid
+from time import perf_counter
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+from app.core.logger import request_id_var
+from app.core.metrics import (
+    REQUEST_DB_STATEMENTS,
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    start_request_timings,
+)
+
+
+class MetricsMiddleware:
+    """
+    Record per-route latency and SQL usage, and expose them to the client
+    through a Server-Timing header.
+
+    Written as a plain ASGI middleware rather than BaseHTTPMiddleware so it
+    adds no extra task or body buffering per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        timings = start_request_timings()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = timings.server_timing(perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template so path parameters don't explode cardinality
+            route = scope.get("route")
+            route_label = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route_label, str(status_code)).observe(perf_counter() - start)
+            REQUEST_DB_STATEMENTS.labels(method, route_label).observe(timings.db_statements)
+            REQUEST_DB_TIME.labels(method, route_label).observe(timings.db_time)
+
+
+class CorrelationIdMiddleware:
+    """
+    Attach a correlation ID to every request, taken from the incoming
+    X-Request-ID header or generated, so log records can be tied together.
+    The ID is echoed back in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip responses of at least `minimum_size` bytes for clients that accept
+    it; smaller ones aren't worth the CPU and are sent as they are. Event
+    streams are left alone, since the compressor would hold events back.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _StreamAwareGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class _StreamAwareGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("Content-Type", "")
+            if content_type.startswith("text/event-stream"):
+                # Passed through untouched, as if already encoded
+                self.content_encoding_set = True
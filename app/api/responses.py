@@ -0,0 +1,57 @@
+import enum
+from datetime import date, datetime
+from typing import Any
+
+import msgpack
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _msgpack_default(value):
+    # Same representation as the JSON responses: ISO 8601 strings and enum values
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default)
+
+
+def prefers_msgpack(accept: str) -> bool:
+    """
+    Whether an Accept header ranks MessagePack at least as high as JSON.
+    """
+    msgpack_quality = json_quality = 0.0
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_quality = max(json_quality, quality)
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def negotiated_response(request: Request, content: Any) -> Response:
+    """
+    Plain rows as MessagePack when the client asks for it in Accept,
+    otherwise as JSON.
+    """
+    response_class = MsgPackResponse if prefers_msgpack(request.headers.get("accept", "")) else ORJSONResponse
+    return response_class(content, headers={"Vary": "Accept"})
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import schemas
 from app.crud import (
+    ATTENDANCE_FIELDS,
     get_attendance,
-    get_attendances,
+    get_attendances_on_day,
+    get_attendance_rows,
     create_attendance,
     update_attendance,
     delete_attendance
 )
-from app.api.dependencies import get_db, get_current_active_user
-from app.models import User, Attendance, ParentChild, TeacherStudent
+from app.crud.parent_child import get_child_ids_of_parent, is_parent_of
+from app.crud.teacher_student import get_student_ids_of_teacher, is_teacher_of
+from app.api.dependencies import get_db, get_current_active_user, parse_fields
+from app.api.responses import negotiated_response
+from app.models import User
 from app.models.user import RoleEnum
-from datetime import datetime, time
+from datetime import datetime
 from app.schemas import AttendanceOut
+from app.core.config import settings
+from app.core.events import get_broker
+from app.core.metrics import SSE_CONNECTIONS
 
 router = APIRouter()
 
@@ -32,36 +45,18 @@ def get_todays_attendances_for_students(
             detail="Only teachers can access this endpoint."
         )
 
-    # Get the current date (from 00:00 to 23:59)
     today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())  # 00:00
-    end_of_day = datetime.combine(today, datetime.max.time())  # 23:59
 
     # Query for the students assigned to the current teacher
-    students = (
-        db.query(User.id)
-        .join(TeacherStudent, TeacherStudent.student_id == User.id)
-        .filter(TeacherStudent.teacher_id == current_user.id)
-        .all()
-    )
+    student_ids = get_student_ids_of_teacher(db, current_user.id)
 
-    if not students:
+    if not student_ids:
         return []  # If there are no students, return an empty list
 
-    student_ids = [student.id for student in students]
-
     # Query for today's attendances for the teacher's students
-    attendances = (
-        db.query(Attendance)
-        .filter(
-            Attendance.user_id.in_(student_ids),
-            Attendance.time_in >= start_of_day,
-            Attendance.time_in <= end_of_day
-        )
-        .all()
-    )
+    attendances = get_attendances_on_day(db, student_ids, today)
 
-    # Map attendances to students
+    # At most one attendance per student and day
     attendance_map = {attendance.user_id: attendance for attendance in attendances}
 
     # Build the response, including students with no attendance
@@ -97,35 +92,19 @@ def get_todays_attendances_for_children(
             detail="Only parents can access this endpoint."
         )
 
-    # Get the current date (from 00:00 to 23:59)
     today = datetime.now().date()
-    start_of_day = datetime.combine(today, time.min)  # 00:00
-    end_of_day = datetime.combine(today, time.max)  # 23:59
 
     # Query for the children of the current parent
-    children = (
-        db.query(User.id, User.first_name, User.last_name)
-        .join(ParentChild, ParentChild.child_id == User.id)
-        .filter(ParentChild.parent_id == current_user.id)
-        .all()
-    )
+    child_ids = get_child_ids_of_parent(db, current_user.id)
 
-    if not children:
+    if not child_ids:
         return []  # If there are no children, return an empty list
 
     # Create a dictionary to track attendances for each child
-    attendance_records = {child.id: None for child in children}
+    attendance_records = {child_id: None for child_id in child_ids}
 
     # Query for today's attendances for the parent's children
-    attendances = (
-        db.query(Attendance)
-        .filter(
-            Attendance.user_id.in_([child.id for child in children]),
-            Attendance.time_in >= start_of_day,
-            Attendance.time_in <= end_of_day
-        )
-        .all()
-    )
+    attendances = get_attendances_on_day(db, child_ids, today)
 
     # Map attendances to the dictionary
     for attendance in attendances:
@@ -133,18 +112,18 @@ def get_todays_attendances_for_children(
 
     # Build the final response
     result = []
-    for child in children:
-        if attendance_records[child.id] is None:
+    for child_id in child_ids:
+        if attendance_records[child_id] is None:
             # If no attendance, return an object with null times
             result.append({
                 "id": None,  # No attendance record ID
-                "user_id": child.id,
+                "user_id": child_id,
                 "time_in": None,
                 "time_out": None
             })
         else:
             # Otherwise, include the attendance record
-            result.append(attendance_records[child.id])
+            result.append(attendance_records[child_id])
 
     return result
 
@@ -152,13 +131,13 @@ def get_todays_attendances_for_children(
 @router.get("/child/{child_id}/attendance")
 def get_child_attendance(
         child_id: int,
+        request: Request,
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user)  # Could be parent or admin
 ):
     # Check if current_user is a parent of the requested child
     if current_user.role == RoleEnum.parent:
-        link = db.query(ParentChild).filter_by(parent_id=current_user.id, child_id=child_id).first()
-        if not link:
+        if not is_parent_of(db, current_user.id, child_id):
             raise HTTPException(status_code=403, detail="You are not a parent of this child.")
 
     # Optionally allow admin or teachers
@@ -166,34 +145,82 @@ def get_child_attendance(
     # or if role=admin, skip the relationship check.
 
     # Now fetch attendance
-    attendance_records = db.query(Attendance).filter(Attendance.user_id == child_id).all()
-    return attendance_records
+    attendance_records = get_attendance_rows(db=db, user_id=child_id)
+    return negotiated_response(request, attendance_records)
 
 
 @router.get("/student/{student_id}/attendance")
 def get_student_attendance(
         student_id: int,
+        request: Request,
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user)
 ):
     # If teacher, verify the teacher-student link
     if current_user.role == RoleEnum.teacher:
-        link = db.query(TeacherStudent).filter_by(teacher_id=current_user.id, student_id=student_id).first()
-        if not link:
+        if not is_teacher_of(db, current_user.id, student_id):
             raise HTTPException(status_code=403, detail="You are not a teacher of this student.")
 
     # If admin, skip check or do a different check as needed
     # If role=admin, typically they can see all
 
-    attendance_records = db.query(Attendance).filter(Attendance.user_id == student_id).all()
-    return attendance_records
+    attendance_records = get_attendance_rows(db=db, user_id=student_id)
+    return negotiated_response(request, attendance_records)
+
+
+@router.get("/stream")
+def stream_attendances(
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+    Server-sent events for attendance records of the caller's children
+    (parents), students (teachers), everyone (admins) or the caller.
+    Each `attendance` event carries `{"type": "attendance.created" | "attendance.updated"
+    | "attendance.deleted", "user_id", "attendance"}`; comments are sent as keep-alives.
+    """
+    if current_user.role == RoleEnum.admin:
+        user_ids = None
+    elif current_user.role == RoleEnum.parent:
+        user_ids = get_child_ids_of_parent(db, current_user.id)
+    elif current_user.role == RoleEnum.teacher:
+        user_ids = get_student_ids_of_teacher(db, current_user.id)
+    else:
+        user_ids = [current_user.id]
+
+    # The session is released before streaming starts; an idle stream holds no connection
+    return StreamingResponse(
+        attendance_events(user_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def attendance_events(user_ids):
+    broker = get_broker()
+    subscription = broker.subscribe(user_ids)
+    SSE_CONNECTIONS.inc()
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield b"event: attendance\ndata: " + orjson.dumps(event) + b"\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+        SSE_CONNECTIONS.dec()
 
 
 @router.post("/", response_model=schemas.AttendanceOut, status_code=status.HTTP_201_CREATED)
 def create_attendance_endpoint(attendance: schemas.AttendanceCreate, db: Session = Depends(get_db),
                                current_user: User = Depends(get_current_active_user)):
     """
-    Create a new attendance record.
+    Record an attendance scan. Idempotent: a user has one record per day,
+    which repeated scans return (widening time_in/time_out if needed)
+    instead of adding rows.
     """
     # Optional: Verify that the current user is allowed to create attendance for the specified user_id
 
@@ -207,17 +234,22 @@ def create_attendance_endpoint(attendance: schemas.AttendanceCreate, db: Session
 
 
 @router.get("/", response_model=List[schemas.AttendanceOut])
-def read_attendances(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
+def read_attendances(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None,
+                     db: Session = Depends(get_db),
                      current_user: User = Depends(get_current_active_user)):
     """
     Retrieve a list of attendance records.
+
+    - **fields**: comma-separated subset of the AttendanceOut fields to return, e.g. `user_id,time_in`.
     """
+    fields = parse_fields(fields, ATTENDANCE_FIELDS)
     # Optional: Filter attendances based on user role
     if current_user.role != RoleEnum.admin:
-        attendances = db.query(Attendance).filter(Attendance.user_id == current_user.id).offset(skip).limit(limit).all()
+        attendances = get_attendance_rows(db=db, skip=skip, limit=limit, user_id=current_user.id, fields=fields)
     else:
-        attendances = get_attendances(db=db, skip=skip, limit=limit)
-    return attendances
+        attendances = get_attendance_rows(db=db, skip=skip, limit=limit, fields=fields)
+    # Rows are already shaped like AttendanceOut, so skip response_model validation
+    return negotiated_response(request, attendances)
 
 
 @router.get("/{attendance_id}", response_model=schemas.AttendanceOut)
@@ -252,7 +284,11 @@ def update_attendance_endpoint(attendance_id: int, updates: schemas.AttendanceUp
     if current_user.role != RoleEnum.admin and db_attendance.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Insufficient permissions.")
 
-    updated_attendance = update_attendance(db=db, db_attendance=db_attendance, updates=updates)
+    try:
+        updated_attendance = update_attendance(db=db, db_attendance=db_attendance, updates=updates)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The user already has an attendance record on that day.")
     return updated_attendance
 
 
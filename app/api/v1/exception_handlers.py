@@ -1,28 +1,39 @@
 from fastapi import Request, FastAPI, status, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from app.api.v1.schemas import ErrorResponse, ValidationErrorDetail
 import logging
+from app.api.v1.schemas import ErrorResponse, ValidationErrorDetail
+from app.core.logger import get_logger
 
 # Initialize logger
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 
 def add_exception_handlers(app: FastAPI):
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
-        logger.error(f"HTTPException: {exc.detail} for path {request.url.path}")
+        # Client errors are expected traffic; only server errors are logged as errors
+        level = logging.ERROR if exc.status_code >= 500 else logging.INFO
+        logger.log(
+            level,
+            f"HTTPException: {exc.detail} for path {request.url.path}",
+            extra={"event": f"http_exception.{exc.status_code}", "status": exc.status_code},
+        )
         return JSONResponse(
             status_code=exc.status_code,
             content={
                 "status": exc.status_code,
                 "message": exc.detail
             },
+            headers=exc.headers,
         )
 
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
-        logger.error(f"ValidationError: {exc.errors()} for path {request.url.path}")
+        logger.info(
+            f"ValidationError: {exc.errors()} for path {request.url.path}",
+            extra={"event": "validation_error", "status": status.HTTP_422_UNPROCESSABLE_ENTITY},
+        )
         formatted_errors = [
             ValidationErrorDetail(**error) for error in exc.errors()
         ]
@@ -37,7 +48,11 @@ def add_exception_handlers(app: FastAPI):
 
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
-        logger.error(f"Unhandled Exception: {str(exc)} for path {request.url.path}")
+        logger.error(
+            f"Unhandled Exception: {str(exc)} for path {request.url.path}",
+            exc_info=exc,
+            extra={"event": "unhandled_exception"},
+        )
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
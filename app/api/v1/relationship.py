@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.api.dependencies import get_db, get_current_active_admin  # A dependency that checks if user is admin
-from app.crud.parent_child import create_parent_child
-from app.crud.teacher_student import create_teacher_student
+from app.api.dependencies import get_db, get_current_active_admin, read_bulk_rows  # A dependency that checks if user is admin
+from app.crud.parent_child import create_parent_child, bulk_create_parent_child
+from app.crud.teacher_student import create_teacher_student, bulk_create_teacher_student
 
 router = APIRouter()
 
@@ -25,3 +26,32 @@ def add_teacher_student_relationship(
 ):
     link = create_teacher_student(db, teacher_id=teacher_id, student_id=student_id)
     return {"message": "Teacher-Student relationship created", "relationship_id": link.id}
+
+
+@router.post("/parent-child/bulk")
+async def bulk_add_parent_child_relationships(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_admin)
+):
+    """
+    Import parent-child links from rows with `parent_id` and `child_id`.
+    Links that already exist are skipped; rows whose users don't exist or
+    have the wrong role are reported and skipped.
+    """
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(bulk_create_parent_child, db, rows)
+
+@router.post("/teacher-student/bulk")
+async def bulk_add_teacher_student_relationships(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_admin)
+):
+    """
+    Import teacher-student links from rows with `teacher_id` and `student_id`.
+    Links that already exist are skipped; rows whose users don't exist or
+    have the wrong role are reported and skipped.
+    """
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(bulk_create_teacher_student, db, rows)
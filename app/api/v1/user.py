@@ -1,18 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import schemas, crud
-from app.api.dependencies import get_db, get_current_active_user, get_current_active_admin
-from app.models.user import User
-from app.models.user_embedding import UserEmbedding
+from app.api.dependencies import get_db, get_current_active_user, get_current_active_admin, parse_fields, read_bulk_rows
+from app.api.responses import negotiated_response
+from app.models.user import RoleEnum, User
 from app.schemas import UserOut
-from app.utils.pinecone_face import get_pinecone_index
-from deepface import DeepFace
+from app.utils.vector_store import get_vector_store
+from app.core.config import settings
+from app.core.metrics import timed, STREAM_FRAMES, STREAM_EMBEDDINGS
+from app.db.session import SessionLocal
+from app.utils import face
+from app.utils import face_quality
+from app.utils.face_quality import FrameQualityError
+from app.utils.face_assignment import assign_faces
+from app.utils.face_tracker import FaceTracker
+from app.utils.admission import Overloaded, Priority, check_in_deadline, group_check_in_deadline, inference_slot
+from app.utils.enrollment import remove_user_vectors, submit_enrollment
+from app.crud.teacher_student import get_student_ids_of_teacher
+import base64
+from datetime import datetime
 import numpy as np
+import orjson
+import os
 import tempfile
 
 router = APIRouter()
 
+# Cosine similarity a gallery match must exceed to verify a face
+MATCH_THRESHOLD = 0.6
+
 @router.get("/me", response_model=UserOut, summary="Get Current User")
 def read_current_user(
     current_user: User = Depends(get_current_active_user)
@@ -25,68 +43,371 @@ def read_current_user(
     return current_user
 
 @router.post("/verify", status_code=200)
-async def verify_user_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def verify_user_image(file: UploadFile = File(...), teacher_id: Optional[int] = None, debug: bool = False,
+                            db: Session = Depends(get_db)):
     """
     Verify a user's identity by comparing the uploaded image with embeddings stored in Pinecone.
+    Blurry, badly lit or too distant images are rejected with 422 and a `reason` before inference.
+    Under overload, requests are shed with 429 (queue full) or 503 (deadline) and a Retry-After header.
+
+    - **teacher_id**: only match against this teacher's students, e.g. for a classroom kiosk.
+    - **debug**: include per-stage timings (ms) of the face pipeline in the response.
     """
+    timings = {}
+    deadline = check_in_deadline()
     try:
-        # Save the uploaded file temporarily
+        contents = await file.read()
+        # Inference and DB access block, so keep them off the event loop
+        result = await run_in_threadpool(verify_image_bytes, contents, db, timings, deadline, teacher_id)
+        if debug:
+            result["timings"] = stage_timings_ms(timings)
+        return result
+
+    except FrameQualityError as e:
+        # Rejected before inference; the kiosk should retake straight away
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "message": str(e)})
+    except Overloaded as e:
+        # Shed load instead of queueing past the deadline
+        raise HTTPException(status_code=e.status_code, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
+
+
+def verify_image_bytes(contents: bytes, db: Session, timings: dict = None, deadline: float = None,
+                       teacher_id: int = None) -> dict:
+    """
+    Face pipeline behind /verify: embed the image, search the gallery
+    (restricted to the teacher's students when given) and look up the best
+    match above the similarity threshold.
+    """
+    # Save the uploaded file temporarily
+    with timed("image_write", timings):
         with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-            temp_file.write(await file.read())
+            temp_file.write(contents)
             temp_file_path = temp_file.name
 
+    try:
         # Generate embedding for the uploaded image
-        uploaded_embedding = DeepFace.represent(
-            img_path=temp_file_path,
-            model_name="Facenet512"
-        )[0]["embedding"]
-
-        # Normalize and convert embedding to Python list
-        uploaded_embedding = normalize_embedding(np.array(uploaded_embedding)).tolist()
-
-        # Get Pinecone index
-        pinecone_index = get_pinecone_index()
-
-        # Query Pinecone for the top 10 closest matches
-        query_result = pinecone_index.query(
-            vector=uploaded_embedding,
-            top_k=10,  # Fetch top 10 matches
-            include_metadata=True
-        )
+        uploaded_embedding = face.embed_image_file(temp_file_path, timings, quality_gate=settings.QUALITY_GATE,
+                                                   deadline=deadline)
+    finally:
+        os.unlink(temp_file_path)
 
-        best_match = None
-        highest_score = 0
+    candidates = None
+    if teacher_id is not None:
+        with timed("candidates", timings):
+            candidates = get_student_ids_of_teacher(db, teacher_id)
+    return match_embedding(uploaded_embedding, db, timings, candidates)
 
-        # Iterate through the matches to find the best match
-        for match in query_result["matches"]:
-            similarity_score = match["score"]
-            user_id = match["metadata"]["user_id"]
 
-            # print(f"Similarity Score: {similarity_score} for user_id: {user_id}")
+@router.post("/verify/group", status_code=200)
+async def verify_group_image(file: UploadFile = File(...), teacher_id: Optional[int] = None, debug: bool = False,
+                             db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    Take attendance from one classroom photo. Every face is detected, the
+    faces are embedded as one batch and matched against the gallery
+    together, each student to at most one face, and all recognized students
+    are checked in in a single transaction. Quality rejections and load
+    shedding work as for /verify.
+
+    - **teacher_id**: only match this teacher's students. Teachers always use their own; admins
+      may omit it to match everyone.
+    - **debug**: include per-stage timings (ms) of the face pipeline in the response.
+    """
+    if current_user.role == RoleEnum.teacher:
+        if teacher_id not in (None, current_user.id):
+            raise HTTPException(status_code=403, detail="Teachers can only take attendance for their own students.")
+        teacher_id = current_user.id
+    elif current_user.role != RoleEnum.admin:
+        raise HTTPException(status_code=403, detail="Only teachers and admins can take group attendance.")
+
+    timings = {}
+    deadline = group_check_in_deadline()
+    try:
+        contents = await file.read()
+        result = await run_in_threadpool(verify_group_bytes, contents, db, timings, deadline, teacher_id)
+        if debug:
+            result["timings"] = stage_timings_ms(timings)
+        return result
+
+    except FrameQualityError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "message": str(e)})
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
 
-            if similarity_score > 0.6 and similarity_score > highest_score:  # Adjust threshold as needed
-                highest_score = similarity_score
-                best_match = user_id
 
-        if best_match:
-            # Fetch the user details from the database
-            user = db.query(User).filter(User.id == best_match).first()
-            if user:
-                return {
-                    "verified": True,
-                    "user": {
-                        "id": user.id,
-                        "first_name": user.first_name,
-                        "last_name": user.last_name
-                    },
-                    "similarity_score": highest_score
-                }
-
-        # If no match exceeds the threshold
+def verify_group_bytes(contents: bytes, db: Session, timings: dict = None, deadline: float = None,
+                       teacher_id: int = None) -> dict:
+    """
+    Face pipeline behind /verify/group: detect and embed every face, match
+    them all in one gallery query, assign users one-to-one and check the
+    recognized users in.
+    """
+    with timed("decode", timings):
+        img = face.decode_image_bytes(contents)
+    if settings.QUALITY_GATE:
+        with timed("quality", timings):
+            face_quality.check_frame(img)
+
+    faces, rejected = [], []
+    with inference_slot(Priority.CHECK_IN, deadline, timings, kind="group"):
+        with timed("detect", timings):
+            # Without a face DeepFace returns the whole frame with confidence 0
+            detections = [d for d in face.detect_faces(img, enforce_detection=False) if d["confidence"]]
+        for detection in detections:
+            try:
+                if settings.QUALITY_GATE:
+                    face_quality.check_face(detection)
+                faces.append(detection)
+            except FrameQualityError as e:
+                rejected.append({"facial_area": facial_box(detection), "reason": e.reason})
+        with timed("embed", timings):
+            embeddings = face.embed_faces(faces)
+
+    candidates = None
+    if teacher_id is not None:
+        with timed("candidates", timings):
+            candidates = get_student_ids_of_teacher(db, teacher_id)
+    matches = [[] for _ in faces]
+    if embeddings and (candidates is None or candidates):
+        with timed("vector_query", timings):
+            matches = get_vector_store().query_many(
+                [normalize_embedding(np.array(embedding)).tolist() for embedding in embeddings],
+                top_k=10, user_ids=candidates,
+            )
+    with timed("assign", timings):
+        assigned = assign_faces(matches, MATCH_THRESHOLD)
+
+    users = {}
+    if assigned:
+        with timed("user_lookup", timings):
+            users = {
+                user.id: user for user in
+                db.query(User.id, User.first_name, User.last_name)
+                .filter(User.id.in_([match.user_id for match in assigned.values()]))
+            }
+    with timed("attendance_write", timings):
+        created, existing = crud.create_attendances(
+            db, [match.user_id for match in assigned.values() if match.user_id in users], datetime.now()
+        )
+    attendances = {row["user_id"]: row for row in existing + created}
+    created_user_ids = {row["user_id"] for row in created}
+
+    recognized, unrecognized = [], []
+    for index, detection in enumerate(faces):
+        match = assigned.get(index)
+        if match is None or match.user_id not in users:
+            unrecognized.append({"facial_area": facial_box(detection)})
+            continue
+        user = users[match.user_id]
+        recognized.append({
+            "user": {"id": user.id, "first_name": user.first_name, "last_name": user.last_name},
+            "similarity_score": match.score,
+            "facial_area": facial_box(detection),
+            "attendance_id": attendances[user.id]["id"],
+            "already_checked_in": user.id not in created_user_ids,
+        })
+    return {
+        "faces": len(detections),
+        "recognized": recognized,
+        "unrecognized": unrecognized,
+        "rejected": rejected,
+        "checked_in": len(created),
+        "already_checked_in": len(existing),
+    }
+
+
+def facial_box(detection) -> dict:
+    area = detection["facial_area"]
+    return {key: area[key] for key in ("x", "y", "w", "h")}
+
+
+def match_embedding(embedding, db: Session, timings: dict = None, candidates: Optional[List[int]] = None) -> dict:
+    """
+    Search the gallery for an embedding and look up the best match above
+    the similarity threshold. `candidates` restricts the search to those
+    user ids; None searches everyone.
+    """
+    if candidates is not None and not candidates:
         return {"verified": False, "message": "No matching user found."}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
+    # Normalize and convert embedding to Python list
+    uploaded_embedding = normalize_embedding(np.array(embedding)).tolist()
+
+    # Query the face gallery for the top 10 closest matches
+    with timed("vector_query", timings):
+        matches = get_vector_store().query(uploaded_embedding, top_k=10, user_ids=candidates)
+
+    best_match = None
+    highest_score = 0
+
+    # Iterate through the matches to find the best match
+    for match in matches:
+        similarity_score = match.score
+        user_id = match.user_id
+
+        # print(f"Similarity Score: {similarity_score} for user_id: {user_id}")
+
+        if similarity_score > MATCH_THRESHOLD and similarity_score > highest_score:
+            highest_score = similarity_score
+            best_match = user_id
+
+    if best_match:
+        # Fetch the user details from the database
+        with timed("user_lookup", timings):
+            user = db.query(User).filter(User.id == best_match).first()
+        if user:
+            return {
+                "verified": True,
+                "user": {
+                    "id": user.id,
+                    "first_name": user.first_name,
+                    "last_name": user.last_name
+                },
+                "similarity_score": highest_score
+            }
+
+    # If no match exceeds the threshold
+    return {"verified": False, "message": "No matching user found."}
+
+
+@router.websocket("/verify/stream")
+async def verify_stream(websocket: WebSocket, teacher_id: Optional[int] = None):
+    """
+    Continuous verification for kiosk cameras.
+
+    The kiosk sends camera frames as binary messages (JPEG or PNG, downscaled
+    as far as detection allows). Faces are tracked between frames, and one is
+    only embedded when it enters the frame, when its track confidence drops,
+    or periodically while it is still unrecognized. The server pushes JSON
+    events back:
+
+    - `{"event": "verified", "track_id", "user", "similarity_score"}`
+    - `{"event": "unrecognized", "track_id"}`
+    - `{"event": "track_lost", "track_id", "user_id"}`
+    - `{"event": "rejected", "reason", "message"}` for frames failing the quality gate
+    - `{"event": "overloaded", "retry_after"}` when frames are shed under load
+    - `{"event": "error", "message"}` for frames that can't be processed
+    - `{"event": "pace", "fps"}`: the frame rate to send at from now on; sent on
+      connecting and whenever it changes. STREAM_ACTIVE_FPS while someone in
+      view is unrecognized, STREAM_IDLE_FPS once everyone is (or nobody is in view)
+
+    With `?teacher_id=`, only that teacher's students (as of connecting) are matched.
+    """
+    await websocket.accept()
+    candidates = None
+    if teacher_id is not None:
+        candidates = await run_in_threadpool(load_student_ids_of_teacher, teacher_id)
+    tracker = FaceTracker(
+        iou_threshold=settings.STREAM_IOU_THRESHOLD,
+        min_confidence=settings.STREAM_MIN_TRACK_CONFIDENCE,
+        max_misses=settings.STREAM_MAX_MISSES,
+        retry_frames=settings.STREAM_RETRY_FRAMES,
+    )
+    fps = settings.STREAM_IDLE_FPS
+    try:
+        await websocket.send_json({"event": "pace", "fps": fps})
+        while True:
+            frame = await websocket.receive_bytes()
+            if len(frame) > settings.STREAM_MAX_FRAME_BYTES:
+                await websocket.send_json({"event": "error", "message": "Frame too large."})
+                continue
+            try:
+                events = await run_in_threadpool(process_stream_frame, frame, tracker, candidates)
+            except Exception as e:
+                events = [{"event": "error", "message": f"Frame processing failed: {str(e)}"}]
+            for event in events:
+                await websocket.send_json(event)
+            # Frames add nothing once everyone in view is recognized: slow the kiosk down
+            pace = settings.STREAM_IDLE_FPS if tracker.settled() else settings.STREAM_ACTIVE_FPS
+            if pace != fps:
+                fps = pace
+                await websocket.send_json({"event": "pace", "fps": fps})
+    except WebSocketDisconnect:
+        pass
+
+
+def load_student_ids_of_teacher(teacher_id: int) -> List[int]:
+    with SessionLocal() as db:
+        return get_student_ids_of_teacher(db, teacher_id)
+
+
+def process_stream_frame(frame: bytes, tracker: FaceTracker, candidates: Optional[List[int]] = None) -> list:
+    """
+    Run one streamed frame through detection and the tracker, embedding and
+    matching only the tracks that need it. Returns the events to push.
+    """
+    STREAM_FRAMES.inc()
+    with timed("decode"):
+        img = face.decode_image_bytes(frame)
+    if settings.QUALITY_GATE:
+        try:
+            with timed("quality"):
+                face_quality.check_frame(img)
+        except FrameQualityError as e:
+            # Tracks are kept as they are; the next good frame picks them up
+            return [{"event": "rejected", "reason": e.reason, "message": str(e)}]
+    deadline = check_in_deadline()
+    try:
+        with inference_slot(Priority.CHECK_IN, deadline, kind="stream_detect"), timed("detect"):
+            detections = face.detect_faces(img, enforce_detection=False)
+    except Overloaded as e:
+        # The kiosk should lower its frame rate
+        return [{"event": "overloaded", "retry_after": e.retry_after}]
+    # Without a face DeepFace returns the whole frame with confidence 0
+    detections = [d for d in detections if d["confidence"]]
+
+    needs_embedding, lost = tracker.update(detections)
+    events = [
+        {"event": "track_lost", "track_id": track.id, "user_id": track.user_id}
+        for track in lost
+    ]
+    if not needs_embedding:
+        return events
+
+    # Short-lived session, so an idle stream doesn't hold a pooled connection
+    with SessionLocal() as db:
+        for track in needs_embedding:
+            if settings.QUALITY_GATE:
+                try:
+                    face_quality.check_face(track.face)
+                except FrameQualityError:
+                    # Retried after STREAM_RETRY_FRAMES, or sooner if the box
+                    # changes enough (moving closer) to drop the track confidence
+                    track.frames_since_embedding = 0
+                    continue
+            try:
+                with inference_slot(Priority.CHECK_IN, deadline, kind="stream_embed"), timed("embed"):
+                    embedding = face.embed_face(track.face)
+            except Overloaded as e:
+                # Left for the following frames
+                for pending in needs_embedding[needs_embedding.index(track):]:
+                    pending.frames_since_embedding = settings.STREAM_RETRY_FRAMES
+                events.append({"event": "overloaded", "retry_after": e.retry_after})
+                break
+            STREAM_EMBEDDINGS.inc()
+            first_attempt = track.similarity_score is None and track.user_id is None
+            previous_user_id = track.user_id
+            result = match_embedding(embedding, db, candidates=candidates)
+
+            if result["verified"]:
+                tracker.mark_embedded(track, result["user"]["id"], result["similarity_score"])
+                if result["user"]["id"] != previous_user_id:
+                    events.append({
+                        "event": "verified",
+                        "track_id": track.id,
+                        "user": result["user"],
+                        "similarity_score": result["similarity_score"],
+                    })
+            else:
+                tracker.mark_embedded(track, None, None)
+                if first_attempt or previous_user_id is not None:
+                    events.append({"event": "unrecognized", "track_id": track.id})
+    return events
 
 
 def normalize_embedding(embedding):
@@ -96,49 +417,45 @@ def normalize_embedding(embedding):
     return embedding / np.linalg.norm(embedding)
 
 
-@router.post("/users/{user_id}/upload-image", status_code=status.HTTP_201_CREATED)
-def upload_user_image(
+def stage_timings_ms(timings: dict) -> dict:
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+@router.post("/users/{user_id}/upload-image", status_code=status.HTTP_202_ACCEPTED)
+async def upload_user_image(
         user_id: int,
         file: UploadFile = File(...),
         db: Session = Depends(get_db),
         current_admin: User = Depends(get_current_active_admin)
 ):
     """
-    Upload and process an image for a user, and store the embedding in Pinecone.
+    Queue an image for enrollment: a background worker embeds it and stores
+    the embedding in Pinecone. Poll `/enrollment-jobs/{job_id}` for the result.
     """
     # Validate user existence
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_in_threadpool(crud.get_user, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Process the image with DeepFace
-    try:
-        temp_file_path = f"/tmp/{file.filename}"
-        with open(temp_file_path, "wb") as f:
-            f.write(file.file.read())
+    contents = await file.read()
+    job = await run_in_threadpool(submit_enrollment, db, user_id, contents)
+    return {
+        "job_id": job.id,
+        "status": job.status.value,
+        "message": "Image queued for processing"
+    }
 
-        # Generate embedding
-        embedding = DeepFace.represent(img_path=temp_file_path, model_name="Facenet512")[0]["embedding"]
 
-        # Create a unique vector ID for Pinecone
-        vector_id = f"user-{user_id}"
-
-        pinecone_index = get_pinecone_index()
-        # Store the embedding in Pinecone
-        pinecone_index.upsert([(vector_id, embedding, {"user_id": user_id})])
-
-        # Save the vector ID in PostgreSQL
-        new_embedding = UserEmbedding(user_id=user_id, vector_id=vector_id)
-        db.add(new_embedding)
-        db.commit()
-        db.refresh(new_embedding)
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to process image: {str(e)}"
-        )
-
-    return {"message": "Image processed and embedding stored successfully in Pinecone"}
+@router.get("/enrollment-jobs/{job_id}", response_model=schemas.EnrollmentJobOut)
+def read_enrollment_job(job_id: int, db: Session = Depends(get_db),
+                        current_admin: User = Depends(get_current_active_admin)):
+    """
+    Status of an enrollment job: queued, running, succeeded or failed (with the error).
+    """
+    job = crud.get_enrollment_job(db, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Enrollment job not found")
+    return job
 
 
 @router.post("/users/", response_model=schemas.UserOut)
@@ -149,11 +466,64 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 
+@router.post("/users/bulk")
+async def bulk_create_users(request: Request, db: Session = Depends(get_db),
+                            current_admin: User = Depends(get_current_active_admin)):
+    """
+    Provision many users at once from a JSON array or CSV of UserCreate
+    rows (first_name, last_name, email, role, password). Valid rows are
+    created in one transaction; the others are reported by row number.
+    Returns the created users' ids, for example for a relationship import.
+    """
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(crud.bulk_create_users, db, rows)
+
+
 @router.get("/users/", response_model=List[schemas.UserOut])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
-               current_user: User = Depends(get_current_active_user)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+def read_users(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None,
+               db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    List users.
+
+    - **fields**: comma-separated subset of the UserOut fields to return, e.g. `id,first_name`.
+    """
+    fields = parse_fields(fields, crud.USER_FIELDS)
+    # Rows are already shaped like UserOut, so skip ORM and response_model validation
+    users = crud.get_user_rows(db, skip=skip, limit=limit, fields=fields)
+    return negotiated_response(request, users)
+
+
+@router.get("/users/search")
+def search_users(request: Request, q: str = Query(..., min_length=1, max_length=100), role: Optional[schemas.RoleEnum] = None,
+                 limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, db: Session = Depends(get_db),
+                 current_user: User = Depends(get_current_active_user)):
+    """
+    Search users by name or email, best matches first.
+
+    - **q**: words to match; each must prefix or appear in the first name, last name or email.
+    - **cursor**: `next_cursor` from the previous page.
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=422, detail="q must contain at least one word")
+    after = decode_cursor(cursor) if cursor else None
+    users, next_after = crud.search_users(db, q, role=RoleEnum(role.value) if role else None, limit=limit, after=after)
+    return negotiated_response(request, {"items": users, "next_cursor": encode_cursor(next_after) if next_after else None})
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        rank, last_name, first_name, user_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        if not (isinstance(rank, int) and isinstance(last_name, str) and isinstance(first_name, str)
+                and isinstance(user_id, int)):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return rank, last_name, first_name, user_id
 
 
 @router.get("/users/{user_id}", response_model=schemas.UserOut)
@@ -175,10 +545,25 @@ def update_user(user_id: int, updates: schemas.UserUpdate, db: Session = Depends
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db),
+def delete_user(user_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
                 current_user: User = Depends(get_current_active_user)):
     db_user = crud.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    crud.delete_user(db=db, db_user=db_user)
+    vector_ids = crud.delete_user(db=db, db_user=db_user)
+    background_tasks.add_task(remove_user_vectors, vector_ids)
     return
+
+
+@router.post("/users/bulk-delete")
+def bulk_delete_users(request: schemas.UserBulkDelete, background_tasks: BackgroundTasks,
+                      db: Session = Depends(get_db),
+                      current_admin: User = Depends(get_current_active_admin)):
+    """
+    Delete many users at once, e.g. a graduating class. Their attendances,
+    relationships and embeddings go with them; face vectors are removed
+    from the gallery in batches after the response. Unknown ids are ignored.
+    """
+    deleted, vector_ids = crud.delete_users(db, request.user_ids)
+    background_tasks.add_task(remove_user_vectors, vector_ids)
+    return {"deleted": deleted, "vectors_removed": len(vector_ids)}
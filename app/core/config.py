@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+from typing import Dict, Optional
 
 load_dotenv()
 
@@ -15,6 +16,90 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
 
+    # Database connections, per worker process: keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's connection limit
+    # "queue", or "null" behind a transaction pooler (e.g. Neon's -pooler endpoint;
+    # EVENTS_BACKEND=postgres then needs EVENTS_DATABASE_URL)
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 240  # seconds; below Neon's 5 minute idle suspend
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: int = 10
+    DB_POOL_WARMUP: int = 1  # connections opened by each worker at startup, 0 to skip
+    DB_PREPARE_THRESHOLD: int = 2  # psycopg 3 only: executions before a statement is prepared server-side
+
+    # Face recognition
+    VECTOR_STORE: str = "pinecone"  # "pinecone" or "local" (memory-mapped gallery on disk)
+    FACE_GALLERY_PATH: str = "face_gallery"
+    # Load the model / gallery at import time, i.e. in the gunicorn master with preload_app
+    PRELOAD_FACE_MODEL: bool = False
+    PRELOAD_FACE_GALLERY: bool = False
+
+    # Processes hashing passwords for bulk provisioning, per app worker; defaults
+    # to the CPU count divided by WEB_CONCURRENCY (1 when unset), at most 4
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+
+    # Enrollment jobs (image uploads), processed by worker threads in each app process
+    ENROLLMENT_WORKERS: int = 1  # 0 to only queue jobs here and run them elsewhere
+    ENROLLMENT_MAX_ATTEMPTS: int = 3
+    ENROLLMENT_POLL_SECONDS: float = 2.0
+    # Longest poll interval once the queue is empty; above Neon's 5 minute idle
+    # suspend, so an idle app doesn't keep the database awake. Jobs submitted
+    # by another process may wait this long
+    ENROLLMENT_IDLE_POLL_SECONDS: float = 600.0
+    ENROLLMENT_RETRY_BACKOFF_SECONDS: float = 5.0  # doubled after each failed attempt
+    ENROLLMENT_STALE_SECONDS: float = 300.0  # running jobs older than this are claimed again
+
+    # Admission control for inference, per process
+    INFERENCE_CONCURRENCY: int = 1  # TensorFlow already parallelises each call
+    INFERENCE_QUEUE_DEPTH: int = 8  # check-in requests waiting beyond this get 429
+    INFERENCE_DEADLINE_SECONDS: float = 2.0  # check-ins that can't make it get 503
+    GROUP_INFERENCE_DEADLINE_SECONDS: float = 15.0  # the same for /verify/group, which embeds every face
+
+    # Quality gate run before inference on /verify and /verify/stream
+    QUALITY_GATE: bool = True
+    QUALITY_MIN_SHARPNESS: float = 60.0  # variance of the Laplacian at 320px width
+    QUALITY_MIN_BRIGHTNESS: float = 40.0  # mean gray level, 0-255
+    QUALITY_MAX_BRIGHTNESS: float = 220.0
+    QUALITY_MIN_FACE_SIZE: int = 80  # pixels, shorter side of the detected face
+
+    # Streaming verification (/verify/stream)
+    STREAM_MAX_FRAME_BYTES: int = 1_000_000
+    STREAM_IOU_THRESHOLD: float = 0.3
+    STREAM_MIN_TRACK_CONFIDENCE: float = 0.5
+    STREAM_MAX_MISSES: int = 5
+    STREAM_RETRY_FRAMES: int = 15
+    # Frame rates the kiosk is asked to send at: while someone in view is
+    # still unrecognized, and while nobody is or everyone is recognized
+    STREAM_ACTIVE_FPS: float = 5.0
+    STREAM_IDLE_FPS: float = 1.0
+
+    # Repeat attendance scans of a user within this window are answered without a database write.
+    # Per worker: other workers' writes only reach it with EVENTS_BACKEND=postgres, so keep it short
+    ATTENDANCE_DEBOUNCE_SECONDS: float = 5.0
+
+    # Live updates (/attendances/stream)
+    EVENTS_BACKEND: str = "local"  # "local" (single worker) or "postgres" (LISTEN/NOTIFY across workers)
+    # Direct (session-mode) URL for the LISTEN connection; required with
+    # DB_POOL_MODE=null, since a transaction pooler doesn't deliver notifications
+    EVENTS_DATABASE_URL: Optional[str] = None
+    EVENTS_QUEUE_SIZE: int = 100  # per subscriber, further events are dropped
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Response compression; smaller responses are sent uncompressed
+    GZIP_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 5  # 1-9, higher trades CPU for size
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: Optional[str] = "app.log"
+    LOG_QUEUE_SIZE: int = 10000
+    # Max records per event and level within the sampling window; levels not listed are never sampled
+    LOG_SAMPLE_BURST: Dict[str, int] = {"DEBUG": 20, "INFO": 50, "WARNING": 20}
+    LOG_SAMPLE_WINDOW_SECONDS: float = 60.0
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,244 @@
+import asyncio
+import select
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import EVENTS_DROPPED, EVENTS_PUBLISHED
+
+logger = get_logger(__name__)
+
+# Session.info key of the events waiting for the session's transaction to commit
+PENDING_EVENTS = "pending_events"
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue of events, bound to the event loop it was
+    created on. `user_ids` of None receives events for every user.
+    """
+
+    def __init__(self, user_ids: Optional[Set[int]], maxsize: int):
+        self.user_ids = user_ids
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client loses events rather than holding memory
+            EVENTS_DROPPED.inc()
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """
+    In-process pub/sub keyed by the user an event is about. publish() may be
+    called from any thread; events are handed to each subscriber's event loop.
+    Only reaches subscribers in the same worker process.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._by_user: Dict[int, Set[Subscription]] = {}
+        self._everything: Set[Subscription] = set()
+        self._listeners: List[Callable[[dict], None]] = []
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """
+        Call `callback(event)` for every event delivered in this worker, on
+        the delivering thread. Unlike subscribers, listeners see every event.
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def subscribe(self, user_ids: Optional[Iterable[int]]) -> Subscription:
+        subscription = Subscription(None if user_ids is None else set(user_ids), self.queue_size)
+        with self._lock:
+            if subscription.user_ids is None:
+                self._everything.add(subscription)
+            for user_id in subscription.user_ids or ():
+                self._by_user.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._everything.discard(subscription)
+            for user_id in subscription.user_ids or ():
+                subscribers = self._by_user.get(user_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_user[user_id]
+
+    def publish(self, event: dict, db: Optional[Session] = None):
+        self.publish_many([event], db)
+
+    def publish_many(self, events: List[dict], db: Optional[Session] = None):
+        """
+        Publish events now or, with `db`, when that session's transaction
+        commits (and never if it rolls back).
+        """
+        if db is not None:
+            # Begins the transaction, if the caller hasn't yet, so a rollback clears them
+            db.connection()
+            db.info.setdefault(PENDING_EVENTS, []).extend(events)
+            return
+        EVENTS_PUBLISHED.inc(len(events))
+        for event in events:
+            self.deliver(event)
+
+    def deliver(self, event: dict):
+        with self._lock:
+            subscribers = self._everything | self._by_user.get(event["user_id"], set())
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Event listener failed", extra={"event": "events.callback_failed"})
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Fans events out to every worker through Postgres LISTEN/NOTIFY. Each
+    worker keeps one dedicated listening connection, opened on the first
+    subscription or listener, and delivers notifications to its local subscribers.
+    Listening needs a session-mode connection (not a transaction pooler),
+    so it may use its own `listen_engine`; notifications are sent on `engine`.
+    """
+
+    CHANNEL = "app_events"
+
+    def __init__(self, engine, queue_size: int = 100, listen_engine=None):
+        super().__init__(queue_size)
+        self.engine = engine
+        self.listen_engine = listen_engine or engine
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        self._ensure_listener()
+        super().add_listener(callback)
+
+    def subscribe(self, user_ids: Optional[Iterable[int]]) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(user_ids)
+
+    def publish_many(self, events: List[dict], db: Optional[Session] = None):
+        """
+        With `db`, the notifications are part of the session's transaction
+        (NOTIFY is transactional): delivered on commit, dropped on rollback,
+        without another connection. All events go in one statement.
+        """
+        if not events:
+            return
+        from sqlalchemy import text
+
+        stmt = text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload")
+        params = {"channel": self.CHANNEL, "payloads": [orjson.dumps(event).decode() for event in events]}
+        if db is not None:
+            db.execute(stmt, params)
+        else:
+            with self.engine.connect() as conn:
+                conn.execute(stmt, params)
+                conn.commit()
+        EVENTS_PUBLISHED.inc(len(events))
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="events-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                # Taken out of the pool for good, so it doesn't count against pool_size
+                pooled = self.listen_engine.raw_connection()
+                pooled.detach()
+                conn = pooled.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                try:
+                    while True:
+                        if select.select([conn], [], [], 30) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            self.deliver(orjson.loads(notify.payload))
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("Event listener connection failed, reconnecting",
+                                 extra={"event": "events.listener_failed"})
+                time.sleep(5)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    """
+    The broker selected by settings.EVENTS_BACKEND, created on first use.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if settings.EVENTS_BACKEND == "postgres":
+                    from app.db.session import engine, listen_engine
+                    _broker = PostgresBroker(engine, settings.EVENTS_QUEUE_SIZE, listen_engine)
+                else:
+                    _broker = LocalBroker(settings.EVENTS_QUEUE_SIZE)
+    return _broker
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(db: Session):
+    events = db.info.pop(PENDING_EVENTS, None)
+    if events:
+        get_broker().publish_many(events)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(db: Session, previous_transaction):
+    # A savepoint's rollback keeps the outer transaction's events
+    if not db.in_transaction():
+        db.info.pop(PENDING_EVENTS, None)
+
+
+def publish_attendances(kind: str, attendances: Iterable[dict], db: Session):
+    """
+    Announce that attendance records were created, updated or deleted, as part of
+    the transaction on `db`: call before committing it.
+    """
+    get_broker().publish_many(
+        [{"type": f"attendance.{kind}", "user_id": attendance["user_id"], "attendance": attendance}
+         for attendance in attendances],
+        db,
+    )
+
+
+def publish_attendance(kind: str, attendance: dict, db: Session):
+    publish_attendances(kind, [attendance], db)
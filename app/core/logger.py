@@ -1,30 +1,186 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
 import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+import orjson
 
-def get_logger(name: str = __name__) -> logging.Logger:
-    logger = logging.getLogger(name)
-    if not logger.hasHandlers():
-        logger.setLevel(logging.INFO)
+from app.core.config import settings
+
+# Correlation ID of the request being handled, set by CorrelationIdMiddleware
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "request_id", "suppressed"}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Render records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.request_id is not None:
+            entry["request_id"] = record.request_id
+        if record.suppressed:
+            entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through at most `burst[level]` records per event within each window,
+    dropping the rest. The next record emitted for that event carries the
+    number of records dropped before it in `suppressed`.
+
+    The event key is `extra={"event": ...}` when given, otherwise the
+    unformatted message, so f-string messages should pass an event.
+
+    Counters are swept once per window: expired ones go, except those still
+    holding a suppressed count, which get one more window for their event to
+    recur and report it.
+    """
+
+    def __init__(self, burst: dict, window: float):
+        super().__init__()
+        self.burst = {logging.getLevelName(level.upper()): count for level, count in burst.items()}
+        self.window = window
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.suppressed = 0
+        limit = self.burst.get(record.levelno)
+        if limit is None:
+            return True
+
+        key = (record.name, record.levelno, getattr(record, "event", record.msg))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= self.window:
+                self._sweep(now)
+            window_start, emitted, suppressed = self._counters.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, emitted = now, 0
+            if emitted >= limit:
+                self._counters[key] = (window_start, emitted, suppressed + 1)
+                return False
+            self._counters[key] = (window_start, emitted + 1, 0)
+        record.suppressed = suppressed
+        return True
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        for key, (window_start, _, suppressed) in list(self._counters.items()):
+            age = now - window_start
+            if age >= 2 * self.window or (age >= self.window and not suppressed):
+                del self._counters[key]
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to the background listener without ever blocking the caller.
+    When the queue is full the record is dropped.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that depends on the calling thread before queueing
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """
+    Route the `app` logger hierarchy through a bounded queue to a background
+    listener thread that does the actual stdout and file I/O.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        formatter = JsonFormatter()
 
-        # Console handler
         console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(console_formatter)
-
-        # File handler (optional)
-        file_handler = RotatingFileHandler('app.log', maxBytes=1000000, backupCount=3)
-        file_handler.setLevel(logging.INFO)
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(file_formatter)
-
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+
+        if settings.LOG_FILE:
+            file_handler = RotatingFileHandler(settings.LOG_FILE, maxBytes=1000000, backupCount=3)
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_WINDOW_SECONDS))
+
+        app_logger = logging.getLogger("app")
+        app_logger.setLevel(settings.LOG_LEVEL.upper())
+        app_logger.addHandler(_queue_handler)
+        app_logger.propagate = False
 
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        # The listener thread does not survive fork (e.g. gunicorn preload_app)
+        os.register_at_fork(after_in_child=_restart_listener_in_child)
+        return _queue_handler
+
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_listener_in_child():
+    global _listener
+    _queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def get_logger(name: str = __name__) -> logging.Logger:
+    queue_handler = setup_logging()
+    logger = logging.getLogger(name)
+    # Loggers outside the `app` hierarchy don't inherit its handler
+    if name != "app" and not name.startswith("app.") and queue_handler not in logger.handlers:
+        logger.setLevel(settings.LOG_LEVEL.upper())
+        logger.addHandler(queue_handler)
     return logger
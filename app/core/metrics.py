@@ -0,0 +1,220 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL per HTTP request.",
+    ["method", "route"],
+)
+DB_STATEMENTS = Counter(
+    "db_statements_total",
+    "SQL statements executed, including those outside of requests.",
+)
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of individually timed stages such as model inference and vector store calls.",
+    ["stage"],
+)
+STREAM_FRAMES = Counter(
+    "verify_stream_frames_total",
+    "Frames received on the streaming verification endpoint.",
+)
+STREAM_EMBEDDINGS = Counter(
+    "verify_stream_embeddings_total",
+    "Face embeddings computed for the streaming verification endpoint.",
+)
+FRAME_QUALITY = Counter(
+    "face_frame_quality_total",
+    "Frames checked by the quality gate before inference, by outcome (accepted or the rejection reason).",
+    ["result"],
+)
+FACE_QUALITY = Counter(
+    "face_quality_total",
+    "Detected faces checked by the quality gate before embedding, by outcome (accepted or face_too_small).",
+    ["result"],
+)
+EVENTS_PUBLISHED = Counter(
+    "events_published_total",
+    "Events published to the pub/sub broker.",
+)
+EVENTS_DROPPED = Counter(
+    "events_dropped_total",
+    "Events dropped because a subscriber's queue was full.",
+)
+SSE_CONNECTIONS = Gauge(
+    "sse_connections",
+    "Open server-sent event streams.",
+    multiprocess_mode="livesum",
+)
+ENROLLMENT_JOBS = Counter(
+    "enrollment_jobs_total",
+    "Enrollment jobs by outcome: submitted, succeeded, retried or failed.",
+    ["result"],
+)
+ENROLLMENT_JOB_LATENCY = Histogram(
+    "enrollment_job_duration_seconds",
+    "Time from submitting an enrollment job to it finishing, including queueing and retries.",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+ENROLLMENT_QUEUE_DEPTH = Gauge(
+    "enrollment_jobs_queued",
+    "Enrollment jobs waiting to run, as last seen by a worker.",
+    multiprocess_mode="max",
+)
+ADMISSIONS = Counter(
+    "inference_admissions_total",
+    "Inference admission decisions by priority and result (admitted, queue_full, deadline, timed_out).",
+    ["priority", "result"],
+)
+INFERENCE_QUEUE = Gauge(
+    "inference_queue_waiting",
+    "Callers waiting for an inference slot.",
+    multiprocess_mode="livesum",
+)
+ATTENDANCE_WRITES = Counter(
+    "attendance_writes_total",
+    "Attendance scans by result: created, updated, unchanged or debounced (answered from memory).",
+    ["result"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Connection checkouts that gave up after DB_POOL_TIMEOUT.",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond DB_POOL_SIZE.",
+    multiprocess_mode="livesum",
+)
+DB_CONNECTIONS = Counter(
+    "db_connections_total",
+    "Database connections opened, and invalidated (e.g. dropped by the server and caught by pre-ping).",
+    ["event"],
+)
+
+class RequestTimings:
+    """
+    Mutable per-request accumulator. The same instance is shared with the
+    threadpool that runs sync endpoints, since contextvars are copied into it.
+    """
+    __slots__ = ("db_statements", "db_time", "stages")
+
+    def __init__(self):
+        self.db_statements = 0
+        self.db_time = 0.0
+        self.stages = {}
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"app;dur={total * 1000:.1f}"]
+        if self.db_statements:
+            parts.append(f'db;dur={self.db_time * 1000:.1f};desc="{self.db_statements} queries"')
+        for stage, elapsed in self.stages.items():
+            parts.append(f"{stage};dur={elapsed * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> RequestTimings:
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def get_request_timings():
+    return _request_timings.get()
+
+
+@contextmanager
+def timed(stage: str, into: dict = None):
+    """
+    Time a block under the given stage name, both in the stage histogram
+    and in the current request's Server-Timing header. If `into` is given,
+    the elapsed seconds are also added to it under the stage name.
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        STAGE_LATENCY.labels(stage).observe(elapsed)
+        if into is not None:
+            into[stage] = into.get(stage, 0.0) + elapsed
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.stages[stage] = timings.stages.get(stage, 0.0) + elapsed
+
+
+def instrument_engine(engine):
+    """
+    Count SQL statements and their execution time for the current request,
+    and connections opened and invalidated by the pool.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start_time"] = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info.pop("query_start_time", perf_counter())
+        DB_STATEMENTS.inc()
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.db_statements += 1
+            timings.db_time += elapsed
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        DB_CONNECTIONS.labels("opened").inc()
+
+    @event.listens_for(engine, "invalidate")
+    def invalidate(dbapi_connection, connection_record, exception):
+        DB_CONNECTIONS.labels("invalidated").inc()
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format. When running under
+    several worker processes, PROMETHEUS_MULTIPROC_DIR aggregates them.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
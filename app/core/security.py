@@ -1,3 +1,7 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
@@ -14,6 +18,50 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+# Default ceiling on hashing processes per app worker
+MAX_HASH_WORKERS = 4
+
+def _hash_workers():
+    if settings.PASSWORD_HASH_WORKERS:
+        return settings.PASSWORD_HASH_WORKERS
+    # Each gunicorn worker has its own pool, so they split the CPUs. gunicorn.conf.py
+    # exports its worker count; a plain uvicorn process is the only one.
+    app_workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    return max(1, min(MAX_HASH_WORKERS, (os.cpu_count() or 1) // app_workers))
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn, since forking a process with running threads can deadlock the child
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=_hash_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(cancel_futures=True)
+            _hash_pool = None
+
+def hash_passwords(passwords):
+    """
+    Hash many passwords in parallel on a process pool (started on first use).
+    bcrypt is deliberately slow, so bulk provisioning is bound by this.
+    """
+    passwords = list(passwords)
+    if len(passwords) < 2:
+        return [get_password_hash(password) for password in passwords]
+    pool = _get_hash_pool()
+    chunksize = max(1, len(passwords) // (_hash_workers() * 4))
+    return list(pool.map(get_password_hash, passwords, chunksize=chunksize))
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -1,31 +1,61 @@
 from .user import (
+    USER_FIELDS,
     get_user_by_email,
     create_user,
+    bulk_create_users,
     get_users,
+    get_user_rows,
+    search_users,
     get_user,
     update_user,
     delete_user,
+    delete_users,
     authenticate_user
 )
 from .attendance import (
+    ATTENDANCE_FIELDS,
     get_attendance,
     get_attendances,
+    get_attendances_on_day,
+    get_attendance_rows,
+    attendance_row,
     create_attendance,
+    create_attendances,
     update_attendance,
     delete_attendance
 )
+from .enrollment_job import (
+    create_enrollment_job,
+    get_enrollment_job,
+    count_queued_enrollment_jobs,
+    claim_enrollment_job
+)
 
 __all__ = [
+    "USER_FIELDS",
+    "ATTENDANCE_FIELDS",
     "get_user_by_email",
     "create_user",
+    "bulk_create_users",
     "get_users",
+    "get_user_rows",
+    "search_users",
     "get_user",
     "update_user",
     "delete_user",
+    "delete_users",
     "authenticate_user",
     "get_attendance",
     "get_attendances",
+    "get_attendances_on_day",
+    "get_attendance_rows",
+    "attendance_row",
     "create_attendance",
+    "create_attendances",
     "update_attendance",
-    "delete_attendance"
+    "delete_attendance",
+    "create_enrollment_job",
+    "get_enrollment_job",
+    "count_queued_enrollment_jobs",
+    "claim_enrollment_job"
 ]
@@ -1,6 +1,15 @@
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import case, lambda_stmt, or_, select, update
+import orjson
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.events import get_broker, publish_attendance, publish_attendances
+from app.core.metrics import ATTENDANCE_WRITES
+from app.crud.bulk import insert_returning
 from app.models.attendance import Attendance
 from app.schemas.attendance import AttendanceCreate, AttendanceUpdate
+from app.utils.debounce import Debouncer
 
 def get_attendance(db: Session, attendance_id: int):
     return db.query(Attendance).filter(Attendance.id == attendance_id).first()
@@ -8,26 +17,182 @@ def get_attendance(db: Session, attendance_id: int):
 def get_attendances(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Attendance).offset(skip).limit(limit).all()
 
-def create_attendance(db: Session, attendance: AttendanceCreate):
-    db_attendance = Attendance(
-        user_id=attendance.user_id,
-        time_in=attendance.time_in,
-        time_out=attendance.time_out
-    )
-    db.add(db_attendance)
+def get_attendances_on_day(db: Session, user_ids: Sequence[int], day: date) -> List[Attendance]:
+    """
+    The attendances of `user_ids` on `day`, at most one per user. A cached
+    lambda statement (see crud.user.get_user); the ids are bound as an
+    expanding IN parameter.
+    """
+    user_ids = list(user_ids)
+    stmt = lambda_stmt(lambda: select(Attendance).where(Attendance.user_id.in_(user_ids), Attendance.day == day))
+    return db.execute(stmt).scalars().all()
+
+# Columns exposed by AttendanceOut, in schema order
+ATTENDANCE_OUT_COLUMNS = (
+    Attendance.id,
+    Attendance.user_id,
+    Attendance.time_in,
+    Attendance.time_out,
+    Attendance.created_at,
+)
+ATTENDANCE_FIELDS = {column.key: column for column in ATTENDANCE_OUT_COLUMNS}
+
+def get_attendance_rows(db: Session, skip: int = 0, limit: int = None, user_id: int = None,
+                        fields: Optional[Sequence[str]] = None):
+    """
+    Attendance records as plain dicts built from column tuples, without
+    materializing Attendance entities. Optionally restricted to one user.
+    `fields` selects a subset of ATTENDANCE_FIELDS; only those columns are queried.
+    """
+    columns = [ATTENDANCE_FIELDS[field] for field in fields] if fields else ATTENDANCE_OUT_COLUMNS
+    query = db.query(*columns)
+    if user_id is not None:
+        query = query.filter(Attendance.user_id == user_id)
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return [row._asdict() for row in query.all()]
+
+def attendance_row(db_attendance: Attendance) -> dict:
+    """
+    An Attendance entity as the dict get_attendance_rows would return.
+    """
+    return {column.key: getattr(db_attendance, column.key) for column in ATTENDANCE_OUT_COLUMNS}
+
+# Recently recorded rows by (user_id, day, "in" | "out"), so repeat scans skip the database
+_recent_attendances = Debouncer(settings.ATTENDANCE_DEBOUNCE_SECONDS)
+
+def create_attendance(db: Session, attendance: AttendanceCreate) -> dict:
+    """
+    Record a check-in, or a check-out when time_out is set, on the day of
+    time_in. There is one row per user and day: the first scan inserts it
+    and later ones can only move time_in earlier or time_out later.
+    Repeats within ATTENDANCE_DEBOUNCE_SECONDS are answered from memory.
+    Returns the row as a dict.
+    """
+    day = attendance.time_in.date()
+    key = (attendance.user_id, day, "in" if attendance.time_out is None else "out")
+    row = _recent_attendances.get(key)
+    if row is not None:
+        ATTENDANCE_WRITES.labels("debounced").inc()
+        return row
+
+    values = {"user_id": attendance.user_id, "day": day,
+              "time_in": attendance.time_in, "time_out": attendance.time_out}
+    inserted = insert_returning(db, Attendance, [values], *ATTENDANCE_OUT_COLUMNS)
+    if inserted:
+        result, row = "created", inserted[0]._asdict()
+    else:
+        row = _merge_attendance(db, attendance, day)
+        result = "unchanged" if row is None else "updated"
+        if row is None:
+            row = (
+                db.query(*ATTENDANCE_OUT_COLUMNS)
+                .filter(Attendance.user_id == attendance.user_id, Attendance.day == day)
+                .one()
+                ._asdict()
+            )
+    if result != "unchanged":
+        publish_attendance(result, row, db)
     db.commit()
-    db.refresh(db_attendance)
-    return db_attendance
+
+    ATTENDANCE_WRITES.labels(result).inc()
+    if result != "unchanged":
+        # e.g. a remembered check-in row without the time_out just recorded
+        _forget_recent_attendances(attendance.user_id)
+    _recent_attendances.set(key, row)
+    return row
+
+def create_attendances(db: Session, user_ids: Iterable[int], time_in: datetime) -> Tuple[List[dict], List[dict]]:
+    """
+    Check several users in at once, e.g. everyone recognized in a group
+    photo: one multi-row insert in one transaction. Users who already have
+    a record for the day keep it unchanged. Returns (created rows, existing rows).
+    """
+    day = time_in.date()
+    values = [{"user_id": user_id, "day": day, "time_in": time_in, "time_out": None} for user_id in user_ids]
+    if not values:
+        return [], []
+    created = [row._asdict() for row in insert_returning(db, Attendance, values, *ATTENDANCE_OUT_COLUMNS)]
+    created_user_ids = {row["user_id"] for row in created}
+    remaining = [value["user_id"] for value in values if value["user_id"] not in created_user_ids]
+    existing = []
+    if remaining:
+        existing = [
+            row._asdict() for row in
+            db.query(*ATTENDANCE_OUT_COLUMNS).filter(Attendance.user_id.in_(remaining), Attendance.day == day)
+        ]
+    publish_attendances("created", created, db)
+    db.commit()
+
+    ATTENDANCE_WRITES.labels("created").inc(len(created))
+    ATTENDANCE_WRITES.labels("unchanged").inc(len(existing))
+    for row in created:
+        _recent_attendances.set((row["user_id"], day, "in"), row)
+    return created, existing
+
+def _merge_attendance(db: Session, attendance: AttendanceCreate, day) -> Optional[dict]:
+    """
+    Widen the existing row for the day to cover `attendance`, in a single
+    UPDATE that only matches when something changes. Returns the updated
+    row, or None if it already covered it.
+    """
+    earlier = Attendance.time_in > attendance.time_in
+    changed = [earlier]
+    values = {Attendance.time_in: case((earlier, attendance.time_in), else_=Attendance.time_in)}
+    if attendance.time_out is not None:
+        later = or_(Attendance.time_out.is_(None), Attendance.time_out < attendance.time_out)
+        changed.append(later)
+        values[Attendance.time_out] = case((later, attendance.time_out), else_=Attendance.time_out)
+    stmt = (
+        update(Attendance)
+        .where(Attendance.user_id == attendance.user_id, Attendance.day == day, or_(*changed))
+        .values(values)
+        .returning(*ATTENDANCE_OUT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    return None if row is None else row._asdict()
 
 def update_attendance(db: Session, db_attendance: Attendance, updates: AttendanceUpdate):
     if updates.time_in is not None:
         db_attendance.time_in = updates.time_in
+        db_attendance.day = updates.time_in.date()
     if updates.time_out is not None:
         db_attendance.time_out = updates.time_out
+    db.flush()
+    publish_attendance("updated", attendance_row(db_attendance), db)
     db.commit()
     db.refresh(db_attendance)
+    _forget_recent_attendances(db_attendance.user_id)
     return db_attendance
 
 def delete_attendance(db: Session, db_attendance: Attendance):
+    row = attendance_row(db_attendance)
     db.delete(db_attendance)
+    publish_attendance("deleted", row, db)
     db.commit()
+    _forget_recent_attendances(db_attendance.user_id)
+
+def _forget_recent_attendances(user_id: int):
+    _recent_attendances.forget(lambda key, row: key[0] == user_id)
+
+def _forget_changed_attendances(event: dict):
+    """
+    Broker listener: forget remembered rows that a write in any worker has
+    since changed or deleted. This worker's own events match what it
+    remembers and keep it.
+    """
+    if not event["type"].startswith("attendance."):
+        return
+    changed = event["attendance"]
+    current = None if event["type"] == "attendance.deleted" else orjson.dumps(changed)
+    _recent_attendances.forget(lambda key, row: row["id"] == changed["id"] and orjson.dumps(row) != current)
+
+def watch_attendance_events():
+    """
+    Keep this worker's remembered rows in step with attendance writes made
+    by every worker (with EVENTS_BACKEND=postgres; otherwise only its own).
+    """
+    get_broker().add_listener(_forget_changed_attendances)
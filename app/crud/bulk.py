@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.types import ARRAY, Integer, String
+from app.models.user import RoleEnum, User
+
+# Rows per INSERT statement; keeps bind parameters well under driver limits
+CHUNK_SIZE = 5000
+
+# Invalid rows reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+class RowErrors:
+    """
+    Per-row errors of a bulk import: all are counted, the first
+    MAX_REPORTED_ERRORS are kept for the response.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.rows = set()
+        self._reported = []
+
+    def add(self, row: int, message: str):
+        self.count += 1
+        self.rows.add(row)
+        if len(self._reported) < MAX_REPORTED_ERRORS:
+            self._reported.append({"row": row, "error": message})
+
+    def reported(self) -> List[dict]:
+        return sorted(self._reported, key=lambda error: error["row"])
+
+def insert_ignore(db: Session, model, rows: List[dict]) -> int:
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING. Returns how many rows were
+    inserted; rows that hit a unique constraint are skipped.
+    """
+    return len(insert_returning(db, model, rows, model.id))
+
+def query_in(db: Session, columns, key, values: Iterable, element_type=Integer) -> list:
+    """
+    Rows of `columns` whose `key` column is one of `values`: a single
+    `= ANY(array)` query on Postgres, chunked IN lists elsewhere.
+    """
+    values = list(values)
+    if db.get_bind().dialect.name == "postgresql":
+        array = bindparam("values", values, type_=ARRAY(element_type))
+        return db.query(*columns).filter(key == any_(array)).all()
+    rows = []
+    for start in range(0, len(values), CHUNK_SIZE):
+        rows.extend(db.query(*columns).filter(key.in_(values[start:start + CHUNK_SIZE])).all())
+    return rows
+
+def get_user_roles(db: Session, user_ids: Iterable[int]) -> Dict[int, RoleEnum]:
+    """
+    Roles of the given users, in a single query on Postgres.
+    """
+    return dict(query_in(db, (User.id, User.role), User.id, user_ids))
+
+def get_existing_emails(db: Session, emails: Iterable[str]) -> set:
+    """
+    Which of the given emails are already registered, in a single query on Postgres.
+    """
+    return {row.email for row in query_in(db, (User.email,), User.email, emails, String)}
+
+def insert_returning(db: Session, model, rows: List[dict], *returning) -> list:
+    """
+    Like insert_ignore, but returns the `returning` columns of the rows
+    actually inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    inserted = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        stmt = (
+            insert(model)
+            .values(rows[start:start + CHUNK_SIZE])
+            .on_conflict_do_nothing()
+            .returning(*returning)
+        )
+        inserted.extend(db.execute(stmt).all())
+    return inserted
+
+def bulk_create_links(db: Session, model, columns: Tuple[str, str],
+                      roles: Tuple[RoleEnum, RoleEnum], rows: List[dict]) -> dict:
+    """
+    Validate and insert relationship rows in one transaction. `columns` are
+    the two user id columns and `roles` the role each must have. Returns
+    counts and the first invalid rows.
+    """
+    errors = RowErrors()
+    pairs = {}
+    parsed = []
+    for index, row in enumerate(rows):
+        try:
+            pair = tuple(int(row[column]) for column in columns)
+        except (KeyError, TypeError, ValueError):
+            errors.add(index, f"Expected integer {columns[0]} and {columns[1]}")
+            continue
+        parsed.append((index, pair))
+
+    user_roles = get_user_roles(db, {user_id for _, pair in parsed for user_id in pair})
+    for index, pair in parsed:
+        for column, user_id, role in zip(columns, pair, roles):
+            if user_id not in user_roles:
+                errors.add(index, f"{column} {user_id} does not exist")
+                break
+            if user_roles[user_id] != role:
+                errors.add(index, f"{column} {user_id} is not a {role.value}")
+                break
+        else:
+            pairs.setdefault(pair, index)
+
+    inserted = insert_ignore(db, model, [dict(zip(columns, pair)) for pair in pairs])
+    db.commit()
+    return {
+        "received": len(rows),
+        "inserted": inserted,
+        "duplicates": len(rows) - errors.count - inserted,
+        "invalid": errors.count,
+        "errors": errors.reported(),
+    }
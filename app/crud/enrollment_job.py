@@ -0,0 +1,65 @@
+from datetime import timedelta
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from app.core.metrics import ENROLLMENT_JOBS
+from app.models.enrollment_job import EnrollmentJob, JobStatusEnum, utcnow
+
+def create_enrollment_job(db: Session, user_id: int, image: bytes, max_attempts: int = 3):
+    db_job = EnrollmentJob(user_id=user_id, image=image, max_attempts=max_attempts)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_enrollment_job(db: Session, job_id: int):
+    return db.query(EnrollmentJob).filter(EnrollmentJob.id == job_id).first()
+
+def count_queued_enrollment_jobs(db: Session):
+    return db.query(EnrollmentJob).filter(EnrollmentJob.status == JobStatusEnum.queued).count()
+
+def claim_enrollment_job(db: Session, stale_after: float):
+    """
+    Mark the oldest runnable job as running and return it, or None. Jobs left
+    running for longer than `stale_after` seconds (a worker died) are
+    claimed again while they have attempts left, and failed once they don't:
+    an image that crashes its worker would otherwise take down one worker
+    after another.
+    """
+    now = utcnow()
+    stale = and_(EnrollmentJob.status == JobStatusEnum.running,
+                 EnrollmentJob.locked_at < now - timedelta(seconds=stale_after))
+    exhausted = db.execute(
+        update(EnrollmentJob)
+        .where(stale, EnrollmentJob.attempts >= EnrollmentJob.max_attempts)
+        .values(status=JobStatusEnum.failed, finished_at=now,
+                error="The worker stopped while processing this image on every attempt.")
+    ).rowcount
+    if exhausted:
+        db.commit()
+        ENROLLMENT_JOBS.labels("failed").inc(exhausted)
+
+    runnable = or_(
+        and_(EnrollmentJob.status == JobStatusEnum.queued, EnrollmentJob.run_after <= now),
+        and_(stale, EnrollmentJob.attempts < EnrollmentJob.max_attempts),
+    )
+    # SKIP LOCKED lets concurrent workers pass over each other's candidates on Postgres
+    candidate = (
+        db.query(EnrollmentJob.id, EnrollmentJob.attempts)
+        .filter(runnable)
+        .order_by(EnrollmentJob.run_after, EnrollmentJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if candidate is None:
+        db.rollback()
+        return None
+    # Conditional update, so only one worker wins even where row locks aren't available
+    claimed = db.execute(
+        update(EnrollmentJob)
+        .where(EnrollmentJob.id == candidate.id, EnrollmentJob.attempts == candidate.attempts, runnable)
+        .values(status=JobStatusEnum.running, attempts=candidate.attempts + 1, locked_at=now)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    return get_enrollment_job(db, candidate.id)
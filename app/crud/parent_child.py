@@ -1,13 +1,25 @@
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
 from app.models.parent_child import ParentChild
+from app.models.user import RoleEnum
+from app.crud.bulk import bulk_create_links
 
 def create_parent_child(db: Session, parent_id: int, child_id: int):
+    link = db.query(ParentChild).filter_by(parent_id=parent_id, child_id=child_id).first()
+    if link:
+        return link
     link = ParentChild(parent_id=parent_id, child_id=child_id)
     db.add(link)
     db.commit()
     db.refresh(link)
     return link
 
+def bulk_create_parent_child(db: Session, rows: list):
+    """
+    Import many links at once; existing links are skipped.
+    """
+    return bulk_create_links(db, ParentChild, ("parent_id", "child_id"), (RoleEnum.parent, RoleEnum.student), rows)
+
 def delete_parent_child(db: Session, link_id: int):
     link = db.query(ParentChild).filter(ParentChild.id == link_id).first()
     if link:
@@ -20,3 +32,16 @@ def get_children_of_parent(db: Session, parent_id: int):
 
 def get_parents_of_child(db: Session, child_id: int):
     return db.query(ParentChild).filter(ParentChild.child_id == child_id).all()
+
+def get_child_ids_of_parent(db: Session, parent_id: int):
+    # A cached lambda statement, see get_user
+    stmt = lambda_stmt(lambda: select(ParentChild.child_id).where(ParentChild.parent_id == parent_id))
+    return list(db.execute(stmt).scalars())
+
+def is_parent_of(db: Session, parent_id: int, child_id: int) -> bool:
+    stmt = lambda_stmt(
+        lambda: select(ParentChild.id)
+        .where(ParentChild.parent_id == parent_id, ParentChild.child_id == child_id)
+        .limit(1)
+    )
+    return db.execute(stmt).first() is not None
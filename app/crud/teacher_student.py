@@ -1,13 +1,25 @@
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
 from app.models.teacher_student import TeacherStudent
+from app.models.user import RoleEnum
+from app.crud.bulk import bulk_create_links
 
 def create_teacher_student(db: Session, teacher_id: int, student_id: int):
+    link = db.query(TeacherStudent).filter_by(teacher_id=teacher_id, student_id=student_id).first()
+    if link:
+        return link
     link = TeacherStudent(teacher_id=teacher_id, student_id=student_id)
     db.add(link)
     db.commit()
     db.refresh(link)
     return link
 
+def bulk_create_teacher_student(db: Session, rows: list):
+    """
+    Import many links at once; existing links are skipped.
+    """
+    return bulk_create_links(db, TeacherStudent, ("teacher_id", "student_id"), (RoleEnum.teacher, RoleEnum.student), rows)
+
 def delete_teacher_student(db: Session, link_id: int):
     link = db.query(TeacherStudent).filter(TeacherStudent.id == link_id).first()
     if link:
@@ -18,5 +30,18 @@ def delete_teacher_student(db: Session, link_id: int):
 def get_students_of_teacher(db: Session, teacher_id: int):
     return db.query(TeacherStudent).filter(TeacherStudent.teacher_id == teacher_id).all()
 
+def get_student_ids_of_teacher(db: Session, teacher_id: int):
+    # Served from the (teacher_id, student_id) unique index; a cached lambda statement, see get_user
+    stmt = lambda_stmt(lambda: select(TeacherStudent.student_id).where(TeacherStudent.teacher_id == teacher_id))
+    return list(db.execute(stmt).scalars())
+
+def is_teacher_of(db: Session, teacher_id: int, student_id: int) -> bool:
+    stmt = lambda_stmt(
+        lambda: select(TeacherStudent.id)
+        .where(TeacherStudent.teacher_id == teacher_id, TeacherStudent.student_id == student_id)
+        .limit(1)
+    )
+    return db.execute(stmt).first() is not None
+
 def get_teachers_of_student(db: Session, student_id: int):
     return db.query(TeacherStudent).filter(TeacherStudent.student_id == student_id).all()
@@ -1,16 +1,92 @@
-from sqlalchemy.orm import Session
-from app.models.user import User
+from typing import Optional, Sequence
+from sqlalchemy import and_, case, delete, func, lambda_stmt, literal, or_, select, tuple_
+from sqlalchemy.orm import Session, load_only
+from pydantic import ValidationError
+from app.models.user import User, RoleEnum
+from app.models.user_embedding import UserEmbedding
+from app.crud.bulk import CHUNK_SIZE, RowErrors, get_existing_emails, insert_returning
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, hash_passwords, verify_password
+
+# Columns exposed by UserOut, in schema order
+USER_OUT_COLUMNS = (User.first_name, User.last_name, User.email, User.role, User.id)
+USER_FIELDS = {column.key: column for column in USER_OUT_COLUMNS}
 
 def get_user(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+    # Runs on every authenticated request. As a lambda statement it is built
+    # and its cache key computed once, at the first call; later calls only
+    # bind user_id. The other hot lookups (link checks, rosters, today's
+    # attendances) follow the same pattern.
+    # hashed_password stays unloaded and raises if read; authentication uses get_user_by_email
+    stmt = lambda_stmt(
+        lambda: select(User).options(load_only(*USER_OUT_COLUMNS, raiseload=True)).where(User.id == user_id)
+    )
+    return db.execute(stmt).scalars().first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
 def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+    return (
+        db.query(User)
+        .options(load_only(*USER_OUT_COLUMNS, raiseload=True))
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def get_user_rows(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None):
+    """
+    Same page as get_users, but as plain dicts built from column tuples,
+    without materializing User entities or loading hashed_password.
+    `fields` selects a subset of USER_FIELDS; only those columns are queried.
+    """
+    columns = [USER_FIELDS[field] for field in fields] if fields else USER_OUT_COLUMNS
+    rows = db.query(*columns).offset(skip).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+# Lowercased columns matched by search_users, indexed on Postgres (see app/db/migrations.py)
+SEARCH_COLUMNS = (func.lower(User.first_name), func.lower(User.last_name), func.lower(User.email))
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_users(db: Session, q: str, role: Optional[RoleEnum] = None, limit: int = 20, after: Optional[tuple] = None):
+    """
+    Users whose first name, last name or email match every word of `q`,
+    as a prefix or (for words of 3+ characters) a substring. Ordered by
+    relevance: an exact email first, then by how many words only matched
+    inside a value rather than at its start; ties by name and id.
+
+    Keyset pagination: `after` is the sort key of the last row of the
+    previous page. Returns (rows, sort key of the last row or None).
+    """
+    words = q.lower().split()[:5]
+    conditions = []
+    rank = case((func.lower(User.email) == q.strip().lower(), -1), else_=0)
+    for word in words:
+        pattern = _escape_like(word)
+        prefix = or_(*(column.like(f"{pattern}%", escape="\\") for column in SEARCH_COLUMNS))
+        if len(word) < 3:
+            # Too short for trigrams; prefix matches use the pattern indexes
+            conditions.append(prefix)
+            continue
+        conditions.append(or_(*(column.like(f"%{pattern}%", escape="\\") for column in SEARCH_COLUMNS)))
+        rank = rank + case((prefix, 0), else_=1)
+
+    sort_key = (rank.label("rank"), func.lower(User.last_name), func.lower(User.first_name), User.id)
+    query = db.query(*USER_OUT_COLUMNS, *sort_key).filter(and_(*conditions))
+    if role is not None:
+        query = query.filter(User.role == role)
+    if after is not None:
+        query = query.filter(tuple_(*sort_key) > tuple_(*(literal(value) for value in after)))
+    rows = query.order_by(*sort_key).limit(limit + 1).all()
+
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = tuple(rows[-1][len(USER_OUT_COLUMNS):])
+    return [dict(zip(USER_FIELDS, row[:len(USER_OUT_COLUMNS)])) for row in rows], next_after
 
 def create_user(db: Session, user: UserCreate):
     hashed_password = get_password_hash(user.password)
@@ -26,6 +102,62 @@ def create_user(db: Session, user: UserCreate):
     db.refresh(db_user)
     return db_user
 
+def bulk_create_users(db: Session, rows: list):
+    """
+    Create many users in one transaction. Rows are validated like
+    UserCreate; emails already registered (checked in one query) or
+    repeated within the import are reported per row and skipped. Passwords
+    are hashed in parallel before the transaction starts.
+    """
+    errors = RowErrors()
+    users = {}
+    for index, row in enumerate(rows):
+        try:
+            user = UserCreate.model_validate(row)
+        except ValidationError as e:
+            errors.add(index, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+            continue
+        if user.email in users:
+            errors.add(index, f"Duplicate email {user.email} in import")
+            continue
+        users[user.email] = (index, user)
+
+    existing = get_existing_emails(db, users)
+    # Don't hold a connection while hashing
+    db.rollback()
+    for email in existing:
+        errors.add(users.pop(email)[0], f"Email {email} already registered")
+
+    hashed_passwords = hash_passwords(user.password for _, user in users.values())
+    values = [
+        {
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+            "hashed_password": hashed_password,
+            "role": RoleEnum(user.role.value),
+        }
+        for (_, user), hashed_password in zip(users.values(), hashed_passwords)
+    ]
+    created = insert_returning(db, User, values, User.id, User.email)
+    db.commit()
+
+    # Registered concurrently, between the check and the insert
+    created_emails = {row.email for row in created}
+    for email, (index, _) in users.items():
+        if email not in created_emails:
+            errors.add(index, f"Email {email} already registered")
+
+    return {
+        "received": len(rows),
+        "created": len(created),
+        "invalid": errors.count,
+        "errors": errors.reported(),
+        "users": [{"row": users[row.email][0], "id": row.id, "email": row.email} for row in created],
+    }
+
 def update_user(db: Session, db_user: User, updates: UserUpdate):
     if updates.first_name is not None:
         db_user.first_name = updates.first_name
@@ -42,8 +174,32 @@ def update_user(db: Session, db_user: User, updates: UserUpdate):
     return db_user
 
 def delete_user(db: Session, db_user: User):
-    db.delete(db_user)
+    """
+    Delete a user; the database cascades to their attendances, links and
+    embeddings. Returns the user's vector ids for removal from the gallery.
+    """
+    return delete_users(db, [db_user.id])[1]
+
+def delete_users(db: Session, user_ids: Sequence[int]):
+    """
+    Delete many users in one transaction, a statement per CHUNK_SIZE ids, leaving
+    dependent rows to ON DELETE CASCADE. Returns (users deleted, their vector ids).
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    deleted = 0
+    vector_ids = []
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        chunk = user_ids[start:start + CHUNK_SIZE]
+        vector_ids.extend(
+            row.vector_id for row in
+            db.query(UserEmbedding.vector_id).filter(UserEmbedding.user_id.in_(chunk))
+        )
+        deleted += db.execute(
+            delete(User).where(User.id.in_(chunk)),
+            execution_options={"synchronize_session": "fetch"},
+        ).rowcount
     db.commit()
+    return deleted, vector_ids
 
 def authenticate_user(db: Session, email: str, password: str):
     user = get_user_by_email(db, email)
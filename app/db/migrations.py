@@ -0,0 +1,126 @@
+from sqlalchemy import inspect, text
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Unique indexes added after tables were first created; create_all only
+# covers new databases. Existing duplicates are removed first, keeping the
+# oldest row.
+UNIQUE_INDEXES = (
+    ("parent_child_relationships", "uq_parent_child", ("parent_id", "child_id")),
+    ("teacher_student_relationships", "uq_teacher_student", ("teacher_id", "student_id")),
+    ("attendances", "uq_attendance_user_day", ("user_id", "day")),
+)
+
+# Indexes on foreign keys that ON DELETE CASCADE has to search
+INDEXES = (
+    ("attendances", "ix_attendances_user_id", ("user_id",)),
+    ("user_embeddings", "ix_user_embeddings_user_id", ("user_id",)),
+    ("parent_child_relationships", "ix_parent_child_relationships_child_id", ("child_id",)),
+    ("teacher_student_relationships", "ix_teacher_student_relationships_student_id", ("student_id",)),
+    ("enrollment_jobs", "ix_enrollment_jobs_user_id", ("user_id",)),
+)
+
+# User search (crud.search_users) on Postgres: trigram GIN indexes for
+# substring matches and text_pattern_ops indexes for prefix matches
+SEARCH_INDEXES = tuple(
+    index
+    for column in ("first_name", "last_name", "email")
+    for index in (
+        (f"ix_users_{column}_trgm", f"USING gin (lower({column}) gin_trgm_ops)"),
+        (f"ix_users_{column}_prefix", f"(lower({column}) text_pattern_ops)"),
+    )
+)
+
+# Foreign keys that were created without ON DELETE CASCADE: (table, column)
+CASCADING_FOREIGN_KEYS = (
+    ("attendances", "user_id"),
+)
+
+
+def run_migrations(engine):
+    """
+    Bring an existing database up to the current models. Every step is
+    idempotent and skipped when already applied.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        if "day" not in {column["name"] for column in inspector.get_columns("attendances")}:
+            _add_attendance_day(conn, engine.dialect.name)
+
+        for table, index, columns in UNIQUE_INDEXES:
+            if index in {existing["name"] for existing in inspector.get_indexes(table)}:
+                continue
+            column_list = ", ".join(columns)
+            removed = conn.execute(text(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MIN(id) FROM {table} GROUP BY {column_list})"
+            )).rowcount
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table} ({column_list})"))
+            logger.info(f"Created unique index {index}, removed {removed} duplicate rows",
+                        extra={"event": "migration.unique_index"})
+
+        for table, index, columns in INDEXES:
+            if index in {existing["name"] for existing in inspector.get_indexes(table)}:
+                continue
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({', '.join(columns)})"))
+            logger.info(f"Created index {index}", extra={"event": "migration.index"})
+
+        if engine.dialect.name == "postgresql":
+            _create_search_indexes(conn, {existing["name"] for existing in inspector.get_indexes("users")})
+
+        for table, column in CASCADING_FOREIGN_KEYS:
+            for foreign_key in inspector.get_foreign_keys(table):
+                if foreign_key["constrained_columns"] != [column]:
+                    continue
+                if (foreign_key.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+                    continue
+                if engine.dialect.name != "postgresql":
+                    # SQLite can't alter constraints; recreate the database to pick it up
+                    logger.warning(f"{table}.{column} lacks ON DELETE CASCADE",
+                                   extra={"event": "migration.skipped"})
+                    continue
+                name = foreign_key["name"]
+                referred = f"{foreign_key['referred_table']} ({', '.join(foreign_key['referred_columns'])})"
+                conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+                    f"REFERENCES {referred} ON DELETE CASCADE"
+                ))
+                logger.info(f"Made {name} cascade on delete", extra={"event": "migration.foreign_key"})
+
+
+def _add_attendance_day(conn, dialect: str):
+    day = "CAST(time_in AS DATE)" if dialect == "postgresql" else "date(time_in)"
+    conn.execute(text("ALTER TABLE attendances ADD COLUMN day DATE"))
+    conn.execute(text(f"UPDATE attendances SET day = {day}"))
+    # Fold each user's duplicate rows for a day into the oldest one, which
+    # the unique index step keeps
+    merged = conn.execute(text(
+        "UPDATE attendances SET "
+        "time_in = (SELECT MIN(a.time_in) FROM attendances a "
+        "WHERE a.user_id = attendances.user_id AND a.day = attendances.day), "
+        "time_out = (SELECT MAX(a.time_out) FROM attendances a "
+        "WHERE a.user_id = attendances.user_id AND a.day = attendances.day) "
+        "WHERE id IN (SELECT MIN(id) FROM attendances GROUP BY user_id, day HAVING COUNT(*) > 1)"
+    )).rowcount
+    logger.info(f"Added attendances.day, merged duplicates into {merged} rows",
+                extra={"event": "migration.column"})
+
+
+def _create_search_indexes(conn, existing):
+    missing = [(name, definition) for name, definition in SEARCH_INDEXES if name not in existing]
+    if not missing:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception:
+        # Needs a privileged role on some hosts; search still works, just unindexed
+        logger.warning("pg_trgm is unavailable, user search substring matches are unindexed",
+                       extra={"event": "migration.skipped"})
+        missing = [(name, definition) for name, definition in missing if "gin_trgm_ops" not in definition]
+    for name, definition in missing:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON users {definition}"))
+        logger.info(f"Created index {name}", extra={"event": "migration.index"})
@@ -0,0 +1,65 @@
+import logging
+from time import perf_counter
+
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.core.logger import get_logger
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_TIMEOUTS, DB_POOL_WAIT
+
+logger = get_logger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long callers wait for a connection, how
+    often they give up, and how far the pool runs into overflow.
+    """
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(perf_counter() - start)
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+
+
+# SQLAlchemy logs pool events under the pool class's module, i.e. in the
+# app's namespace; keep its routine INFO messages out of the app log
+logging.getLogger(f"{__name__}.{InstrumentedQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+def warm_up_pool(engine, connections: int):
+    """
+    Open `connections` connections at once and return them to the pool, so
+    the first requests don't pay for connecting (or for waking a suspended
+    serverless database). Failures are logged, not raised.
+    """
+    if connections <= 0:
+        return
+    opened = []
+    started = perf_counter()
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        logger.exception("Database pool warm-up failed", extra={"event": "db.warm_up_failed"})
+        return
+    finally:
+        for connection in opened:
+            connection.close()
+    logger.info(f"Opened {len(opened)} database connections in {perf_counter() - started:.2f}s",
+                extra={"event": "db.warm_up"})
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool import InstrumentedQueuePool
 
 # Neon PostgreSQL Database Serverless
 SQLALCHEMY_DATABASE_URL = settings.NEON_DATABASE_URL
@@ -9,11 +13,72 @@ SQLALCHEMY_DATABASE_URL = settings.NEON_DATABASE_URL
 # Uncomment if you are gonna Docerkize project
 # SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+pool_options = {}
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # Local development and offline benchmarks
+    connect_args = {"check_same_thread": False}
+else:
+    connect_args = {
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+        # Notice connections silently dropped by the server or a NAT
+        "keepalives": 1,
+        "keepalives_idle": 30,
+    }
+    if "sslmode" not in SQLALCHEMY_DATABASE_URL:
+        connect_args["sslmode"] = "require"
+    if settings.DB_POOL_MODE == "null":
+        # The transaction pooler pools connections, and may hand each
+        # transaction a different server connection: no client-side pool,
+        # and no server-side prepared statements (psycopg 3 only; psycopg2
+        # never prepares)
+        pool_options = {"poolclass": NullPool}
+        if make_url(SQLALCHEMY_DATABASE_URL).get_driver_name() == "psycopg":
+            connect_args["prepare_threshold"] = None
+    else:
+        pool_options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            # Reconnect before the serverless database drops idle connections,
+            # and test each checkout so a dropped one is replaced, not returned
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            # Reuse the most recent connection, letting the rest idle out
+            "pool_use_lifo": True,
+        }
+        if make_url(SQLALCHEMY_DATABASE_URL).get_driver_name() == "psycopg":
+            # Prepare repeated statements server-side, per connection; the hot
+            # lookups in app/crud are cached lambda statements with fixed SQL
+            connect_args["prepare_threshold"] = settings.DB_PREPARE_THRESHOLD
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"sslmode": "require"} if "sslmode" not in SQLALCHEMY_DATABASE_URL else {}
+    connect_args=connect_args,
+    **pool_options
 )
 
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # SQLite ignores foreign keys, including ON DELETE CASCADE, unless asked
+    @event.listens_for(engine, "connect")
+    def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+# Count statements and SQL time per request for /metrics and Server-Timing
+instrument_engine(engine)
+
+# The LISTEN connection of EVENTS_BACKEND=postgres needs a session-mode
+# connection: behind a transaction pooler, notifications are never delivered
+if settings.EVENTS_DATABASE_URL:
+    listen_engine = create_engine(settings.EVENTS_DATABASE_URL, connect_args=connect_args, poolclass=NullPool)
+elif settings.EVENTS_BACKEND == "postgres" and settings.DB_POOL_MODE == "null":
+    raise RuntimeError(
+        "EVENTS_BACKEND=postgres with DB_POOL_MODE=null needs EVENTS_DATABASE_URL, a direct "
+        "(non-pooler) database URL: a transaction pooler doesn't deliver LISTEN/NOTIFY."
+    )
+else:
+    listen_engine = engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
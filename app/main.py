@@ -1,10 +1,22 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.db.session import engine
+from app.db.pool import warm_up_pool
+from app.db.migrations import run_migrations
 from app.models import User, Attendance
 from app.api.v1 import user, auth, attendance, relationship
 from app.api.v1.exception_handlers import add_exception_handlers
+from app.api.middleware import CompressionMiddleware, MetricsMiddleware, CorrelationIdMiddleware
 from app.core.logger import get_logger
+from app.core.metrics import render_metrics
+from app.core.security import shutdown_hash_pool
+from app.core.config import settings
+from app.utils import face
+from app.utils.vector_store import get_vector_store
+from app.utils.enrollment import start_enrollment_workers, stop_enrollment_workers
+from app.crud.attendance import watch_attendance_events
 
 import uvicorn
 
@@ -14,19 +26,46 @@ logger = get_logger("app.main")
 # Create all tables
 User.metadata.create_all(bind=engine)
 Attendance.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+# With gunicorn's preload_app this runs once in the master, and forked workers
+# share the model weights and gallery pages copy-on-write (see gunicorn.conf.py)
+if settings.PRELOAD_FACE_MODEL:
+    face.warm_up()
+if settings.PRELOAD_FACE_GALLERY:
+    get_vector_store().warm_up()
+
+
+# Runs per worker process, after gunicorn forks
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_pool(engine, settings.DB_POOL_WARMUP)
+    start_enrollment_workers()
+    watch_attendance_events()
+    try:
+        yield
+    finally:
+        stop_enrollment_workers()
+        shutdown_hash_pool()
+
 
 app = FastAPI(
     title="Diploma FastAPI",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Allow requests from Next.js
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(CorrelationIdMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
@@ -43,5 +82,12 @@ def health():
     return {"status": "OK"}
 
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
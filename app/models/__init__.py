@@ -3,5 +3,6 @@ from .attendance import Attendance
 from .parent_child import ParentChild
 from .teacher_student import TeacherStudent
 from .user_embedding import  UserEmbedding
+from .enrollment_job import EnrollmentJob
 
-__all__ = ["User", "Attendance", "ParentChild", "TeacherStudent", "UserEmbedding"]
+__all__ = ["User", "Attendance", "ParentChild", "TeacherStudent", "UserEmbedding", "EnrollmentJob"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Column, Date, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -6,9 +6,15 @@ class Attendance(Base):
     __tablename__ = "attendances"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Calendar day of time_in; a user has at most one attendance per day
+    day = Column(Date, nullable=False)
     time_in = Column(DateTime, nullable=False)
     time_out = Column(DateTime, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="attendances")
+    user = relationship("User", back_populates="attendances", lazy="raise")
+
+    __table_args__ = (
+        Index("uq_attendance_user_day", "user_id", "day", unique=True),
+    )
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Enum, Index
+import enum
+from app.db.session import Base
+
+
+def utcnow():
+    # Naive UTC, so comparisons behave the same on Postgres and SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobStatusEnum(enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class EnrollmentJob(Base):
+    __tablename__ = "enrollment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(Enum(JobStatusEnum), nullable=False, default=JobStatusEnum.queued)
+    image = Column(LargeBinary, nullable=True)  # Cleared once the job succeeds
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    run_after = Column(DateTime, nullable=False, default=utcnow)  # Retry backoff
+    locked_at = Column(DateTime, nullable=True)  # When a worker claimed it
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_enrollment_jobs_status_run_after", "status", "run_after"),
+    )
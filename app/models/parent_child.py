@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -7,8 +7,12 @@ class ParentChild(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     parent_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    child_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    child_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # These back_populates will reference two separate relationships in the User model
-    parent = relationship("User", foreign_keys=[parent_id], back_populates="parent_links")
-    child = relationship("User", foreign_keys=[child_id], back_populates="child_links")
+    parent = relationship("User", foreign_keys=[parent_id], back_populates="parent_links", lazy="raise")
+    child = relationship("User", foreign_keys=[child_id], back_populates="child_links", lazy="raise")
+
+    __table_args__ = (
+        Index("uq_parent_child", "parent_id", "child_id", unique=True),
+    )
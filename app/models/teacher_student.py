@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -7,8 +7,12 @@ class TeacherStudent(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     teacher_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Indicate which foreign key belongs to teacher vs. student
-    teacher = relationship("User", foreign_keys=[teacher_id], back_populates="teacher_links")
-    student = relationship("User", foreign_keys=[student_id], back_populates="student_links")
+    teacher = relationship("User", foreign_keys=[teacher_id], back_populates="teacher_links", lazy="raise")
+    student = relationship("User", foreign_keys=[student_id], back_populates="student_links", lazy="raise")
+
+    __table_args__ = (
+        Index("uq_teacher_student", "teacher_id", "student_id", unique=True),
+    )
@@ -21,18 +21,25 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(RoleEnum), nullable=False)
 
+    # Relationships never lazy load (lazy="raise"): load them explicitly with
+    # selectinload/joinedload, so N+1 access patterns fail loudly. Deleting a
+    # user leaves the dependent rows to the ON DELETE CASCADE foreign keys.
     # For parent-child
     parent_links = relationship(
         "ParentChild",
         foreign_keys=[ParentChild.parent_id],
         back_populates="parent",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
     )
     child_links = relationship(
         "ParentChild",
         foreign_keys=[ParentChild.child_id],
         back_populates="child",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
     )
 
     # For teacher-student
@@ -40,17 +47,23 @@ class User(Base):
         "TeacherStudent",
         foreign_keys=[TeacherStudent.teacher_id],
         back_populates="teacher",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
     )
     student_links = relationship(
         "TeacherStudent",
         foreign_keys=[TeacherStudent.student_id],
         back_populates="student",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
     )
 
     # For attendance
-    attendances = relationship("Attendance", back_populates="user", cascade="all, delete-orphan")
+    attendances = relationship("Attendance", back_populates="user", cascade="all, delete-orphan",
+                               passive_deletes=True, lazy="raise")
     # For embedding
-    embeddings = relationship("UserEmbedding", back_populates="user", cascade="all, delete-orphan")
+    embeddings = relationship("UserEmbedding", back_populates="user", cascade="all, delete-orphan",
+                              passive_deletes=True, lazy="raise")
 
@@ -6,7 +6,7 @@ class UserEmbedding(Base):
     __tablename__ = "user_embeddings"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     vector_id = Column(String, unique=True, nullable=False)  # Pinecone vector ID
 
-    user = relationship("User", back_populates="embeddings")
+    user = relationship("User", back_populates="embeddings", lazy="raise")
@@ -3,6 +3,7 @@ from .user import (
     UserCreate,
     UserUpdate,
     UserOut,
+    UserBulkDelete,
     Token,
     TokenData,
     RoleEnum
@@ -13,17 +14,20 @@ from .attendance import (
     AttendanceUpdate,
     AttendanceOut
 )
+from .enrollment_job import EnrollmentJobOut
 
 __all__ = [
     "UserBase",
     "UserCreate",
     "UserUpdate",
     "UserOut",
+    "UserBulkDelete",
     "Token",
     "TokenData",
     "RoleEnum",
     "AttendanceBase",
     "AttendanceCreate",
     "AttendanceUpdate",
-    "AttendanceOut"
+    "AttendanceOut",
+    "EnrollmentJobOut"
 ]
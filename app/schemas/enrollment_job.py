@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.enrollment_job import JobStatusEnum
+
+class EnrollmentJobOut(BaseModel):
+    id: int
+    user_id: int
+    status: JobStatusEnum
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    run_after: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from enum import Enum
 
 class RoleEnum(str, Enum):
@@ -31,6 +31,9 @@ class UserOut(UserBase):
         from_attributes = True  # Updated from orm_mode
         # If using Pydantic v2, 'from_attributes' replaces 'orm_mode'
 
+class UserBulkDelete(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=100000)
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,165 @@
+import enum
+import heapq
+import itertools
+import math
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import ADMISSIONS, INFERENCE_QUEUE, timed
+
+
+class Priority(enum.IntEnum):
+    # Lower runs first
+    CHECK_IN = 0
+    ENROLLMENT = 1
+
+
+class Overloaded(Exception):
+    """
+    Raised instead of queueing work that can't finish in time. `status_code`
+    is 429 when the queue is full and 503 when the deadline would be missed.
+    """
+
+    def __init__(self, status_code: int, retry_after: float, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class InferenceGate:
+    """
+    Admission control for model inference. At most `concurrency` callers
+    run at once, the rest wait in priority order. Callers with a deadline
+    are turned away up front when `max_queue` callers of the same or higher
+    priority are already waiting, or when the work running and queued ahead
+    of them is expected to outlast the deadline. A caller that would get a
+    slot straight away is always admitted. Callers without a deadline
+    (background enrollment) always wait.
+
+    Slots hold very different amounts of work (a stream frame's detection, a
+    /verify detect and embed, a group photo's many embeds), so service times
+    are averaged per `kind` of slot, and the expected wait adds up the kinds
+    running and queued ahead. The first run of each kind (model loading,
+    graph tracing) is left out of its average, and a single stall counts for
+    at most `MAX_SAMPLE_RATIO` times the current average.
+    """
+
+    MAX_SAMPLE_RATIO = 4.0
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.service_times = {}  # kind -> exponentially weighted seconds
+        self._seen = set()  # kinds whose cold first run has been dropped
+        self._condition = threading.Condition()
+        self._active = []  # kinds of the running slots
+        self._waiting = []  # heap of (priority, sequence, kind)
+        self._sequence = itertools.count()
+
+    def service_time(self, kind: str) -> float:
+        return self.service_times.get(kind, 0.0)
+
+    def expected_wait(self, priority: Priority) -> float:
+        ahead = [kind for waiter_priority, _, kind in self._waiting if waiter_priority <= priority]
+        if len(self._active) + len(ahead) < self.concurrency:
+            return 0.0
+        return sum(self.service_time(kind) for kind in self._active + ahead) / self.concurrency
+
+    def acquire(self, priority: Priority, deadline: Optional[float], kind: str = "verify"):
+        label = priority.name.lower()
+        with self._condition:
+            if deadline is not None:
+                ahead = sum(1 for waiter_priority, _, _ in self._waiting if waiter_priority <= priority)
+                wait = self.expected_wait(priority)
+                if ahead >= self.max_queue:
+                    ADMISSIONS.labels(label, "queue_full").inc()
+                    raise Overloaded(429, wait, "Too many verification requests queued, retry shortly.")
+                if wait and monotonic() + wait > deadline:
+                    ADMISSIONS.labels(label, "deadline").inc()
+                    raise Overloaded(503, wait, "Verification would not finish in time, retry shortly.")
+
+            entry = (priority, next(self._sequence), kind)
+            heapq.heappush(self._waiting, entry)
+            INFERENCE_QUEUE.inc()
+            try:
+                while len(self._active) >= self.concurrency or self._waiting[0] != entry:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._waiting.remove(entry)
+                        heapq.heapify(self._waiting)
+                        # Someone else may be at the head now
+                        self._condition.notify_all()
+                        ADMISSIONS.labels(label, "timed_out").inc()
+                        raise Overloaded(503, self.expected_wait(priority),
+                                         "Verification would not finish in time, retry shortly.")
+                    self._condition.wait(remaining)
+                heapq.heappop(self._waiting)
+                self._active.append(kind)
+            finally:
+                INFERENCE_QUEUE.dec()
+            ADMISSIONS.labels(label, "admitted").inc()
+            # More slots may be free for the next waiter
+            self._condition.notify_all()
+
+    def release(self, kind: str, elapsed: float):
+        with self._condition:
+            self._active.remove(kind)
+            previous = self.service_times.get(kind)
+            if kind not in self._seen:
+                self._seen.add(kind)
+            elif previous is None:
+                self.service_times[kind] = elapsed
+            else:
+                elapsed = min(elapsed, self.MAX_SAMPLE_RATIO * previous)
+                self.service_times[kind] = 0.8 * previous + 0.2 * elapsed
+            self._condition.notify_all()
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_inference_gate() -> InferenceGate:
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = InferenceGate(settings.INFERENCE_CONCURRENCY, settings.INFERENCE_QUEUE_DEPTH)
+    return _gate
+
+
+def check_in_deadline() -> float:
+    """
+    Deadline for a check-in request arriving now, on the monotonic clock.
+    """
+    return monotonic() + settings.INFERENCE_DEADLINE_SECONDS
+
+
+def group_check_in_deadline() -> float:
+    """
+    Deadline for a group check-in arriving now. A group photo embeds every
+    face in it, so one run can take longer than a whole single-face deadline.
+    """
+    return monotonic() + settings.GROUP_INFERENCE_DEADLINE_SECONDS
+
+
+@contextmanager
+def inference_slot(priority: Priority, deadline: Optional[float] = None, timings: dict = None,
+                   kind: str = "verify"):
+    """
+    Hold an inference slot for the block, timing the wait as "queue_wait".
+    `kind` names the work done in it ("verify": detect and embed one face,
+    "enroll": the same for a background enrollment, "group", "stream_detect",
+    "stream_embed"), for the service time estimates.
+    """
+    with timed("queue_wait", timings):
+        gate = get_inference_gate()
+        gate.acquire(priority, deadline, kind)
+    start = monotonic()
+    try:
+        yield
+    finally:
+        gate.release(kind, monotonic() - start)
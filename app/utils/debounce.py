@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Hashable, Optional
+
+
+class Debouncer:
+    """
+    Remembers a value per key for `window` seconds. Used to answer repeats
+    of a recent write from memory; per process, so the database still has
+    to enforce uniqueness across workers.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), oldest first since the window is fixed
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[object]:
+        now = monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key: Hashable, value):
+        if self.window <= 0:
+            return
+        now = monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.window, value)
+
+    def forget(self, predicate):
+        """
+        Drop the entries for which `predicate(key, value)` is true.
+        """
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def _expire(self, now: float):
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
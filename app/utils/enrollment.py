@@ -0,0 +1,196 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import ENROLLMENT_JOBS, ENROLLMENT_JOB_LATENCY, ENROLLMENT_QUEUE_DEPTH, timed
+from app.db.session import SessionLocal
+from app.models.enrollment_job import EnrollmentJob, JobStatusEnum, utcnow
+from app.models.user import User
+from app.models.user_embedding import UserEmbedding
+from app.utils import face
+from app.utils.admission import Priority
+from app.utils.vector_store import get_vector_store
+
+logger = get_logger(__name__)
+
+
+def enroll_image(db: Session, user_id: int, contents: bytes, timings: dict = None):
+    """
+    Embed a user's face image and store it in the face gallery. Safe to
+    repeat: the vector is overwritten and the UserEmbedding row reused.
+    """
+    with timed("user_lookup", timings):
+        user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise ValueError("User not found")
+
+    with timed("image_write", timings):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+            temp_file.write(contents)
+            temp_file_path = temp_file.name
+    try:
+        # Waits behind check-in traffic for an inference slot
+        embedding = face.embed_image_file(temp_file_path, timings, priority=Priority.ENROLLMENT)
+    finally:
+        os.unlink(temp_file_path)
+
+    vector_id = f"user-{user_id}"
+    with timed("vector_upsert", timings):
+        get_vector_store().upsert(vector_id, embedding, user_id)
+
+    with timed("db_commit", timings):
+        if not db.query(UserEmbedding.id).filter(UserEmbedding.vector_id == vector_id).first():
+            db.add(UserEmbedding(user_id=user_id, vector_id=vector_id))
+        db.commit()
+
+
+def remove_user_vectors(vector_ids):
+    """
+    Remove deleted users' embeddings from the face gallery, in batches.
+    Runs after the users are gone from the database; a leftover vector can't
+    verify anyone since its user no longer exists.
+    """
+    if not vector_ids:
+        return
+    try:
+        with timed("vector_delete"):
+            get_vector_store().delete(vector_ids)
+    except Exception:
+        logger.exception(f"Failed to remove {len(vector_ids)} vectors of deleted users",
+                         extra={"event": "enrollment.vector_delete_failed"})
+
+
+class EnrollmentWorkerPool:
+    """
+    Threads that claim enrollment jobs from the enrollment_jobs table and run
+    them. Jobs are durable, so any worker of any process can pick up what
+    another left behind. Failures are retried with exponential backoff,
+    except ValueErrors (no face, unreadable image, unknown user), which
+    won't succeed on a retry.
+
+    While the queue stays empty, polls back off from `poll_interval` to
+    `idle_poll_interval`, so an idle app lets a serverless database suspend.
+    Jobs submitted in this process wake the workers at once.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, retry_backoff: float, stale_after: float,
+                 idle_poll_interval: float = None):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.idle_poll_interval = max(poll_interval, idle_poll_interval or poll_interval)
+        self.retry_backoff = retry_backoff
+        self.stale_after = stale_after
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"enrollment-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        wait = self.poll_interval
+        while not self._stop.is_set():
+            queued = 0
+            try:
+                with SessionLocal() as db:
+                    job = crud.claim_enrollment_job(db, self.stale_after)
+                    if job is not None:
+                        self._process(db, job)
+                    queued = crud.count_queued_enrollment_jobs(db)
+                    ENROLLMENT_QUEUE_DEPTH.set(queued)
+            except Exception:
+                logger.exception("Enrollment worker failed to poll", extra={"event": "enrollment.poll_failed"})
+                job = None
+            if job is not None:
+                wait = self.poll_interval
+                continue
+            if queued:
+                # Jobs waiting out a retry backoff keep the short interval
+                wait = self.poll_interval
+            woken = self._wake.wait(wait)
+            self._wake.clear()
+            wait = self.poll_interval if woken else min(wait * 2, self.idle_poll_interval)
+
+    def _process(self, db: Session, job: EnrollmentJob):
+        try:
+            with timed("enrollment_job"):
+                enroll_image(db, job.user_id, job.image)
+        except Exception as e:
+            db.rollback()
+            job.error = str(e)
+            if isinstance(e, ValueError) or job.attempts >= job.max_attempts:
+                job.status = JobStatusEnum.failed
+                job.finished_at = utcnow()
+                result = "failed"
+            else:
+                job.status = JobStatusEnum.queued
+                job.run_after = utcnow() + timedelta(seconds=self.retry_backoff * 2 ** (job.attempts - 1))
+                result = "retried"
+            logger.warning(f"Enrollment job {job.id} {result}: {e}",
+                           extra={"event": f"enrollment.{result}", "job_id": job.id, "attempts": job.attempts})
+        else:
+            job.status = JobStatusEnum.succeeded
+            job.image = None
+            job.error = None
+            job.finished_at = utcnow()
+            result = "succeeded"
+        db.commit()
+        ENROLLMENT_JOBS.labels(result).inc()
+        if job.finished_at is not None:
+            ENROLLMENT_JOB_LATENCY.observe((job.finished_at - job.created_at).total_seconds())
+
+
+_pool = None
+
+
+def start_enrollment_workers():
+    """
+    Start this process's enrollment workers (ENROLLMENT_WORKERS threads).
+    """
+    global _pool
+    if settings.ENROLLMENT_WORKERS > 0 and _pool is None:
+        _pool = EnrollmentWorkerPool(
+            workers=settings.ENROLLMENT_WORKERS,
+            poll_interval=settings.ENROLLMENT_POLL_SECONDS,
+            retry_backoff=settings.ENROLLMENT_RETRY_BACKOFF_SECONDS,
+            stale_after=settings.ENROLLMENT_STALE_SECONDS,
+            idle_poll_interval=settings.ENROLLMENT_IDLE_POLL_SECONDS,
+        )
+        _pool.start()
+
+
+def stop_enrollment_workers():
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
+
+
+def submit_enrollment(db: Session, user_id: int, contents: bytes) -> EnrollmentJob:
+    """
+    Queue an enrollment job and wake a local worker to pick it up.
+    """
+    job = crud.create_enrollment_job(db, user_id, contents, settings.ENROLLMENT_MAX_ATTEMPTS)
+    ENROLLMENT_JOBS.labels("submitted").inc()
+    if _pool is not None:
+        _pool.notify()
+    return job
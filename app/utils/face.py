@@ -0,0 +1,126 @@
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.metrics import timed
+from app.utils import face_quality
+from app.utils.admission import Priority, inference_slot
+
+MODEL_NAME = "Facenet512"
+DETECTOR_BACKEND = "opencv"
+
+_lock = threading.Lock()
+_deepface = None
+
+
+def get_deepface():
+    """
+    Import DeepFace on first use. It pulls in TensorFlow and Keras, which
+    take seconds and hundreds of MB, so workers that only serve auth and
+    attendance traffic never load it.
+    """
+    global _deepface
+    if _deepface is None:
+        with _lock:
+            if _deepface is None:
+                from deepface import DeepFace
+                _deepface = DeepFace
+    return _deepface
+
+
+def decode_image(img_path: str):
+    """
+    Load an image file as a BGR array, the way DeepFace does for file paths.
+    """
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError(f"Could not decode image: {img_path}")
+    return img
+
+
+def decode_image_bytes(data: bytes):
+    """
+    Decode an encoded image (JPEG, PNG, ...) held in memory as a BGR array.
+    """
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image.")
+    return img
+
+
+def detect_faces(img, enforce_detection: bool = True):
+    """
+    Detect and align faces. Returns DeepFace.extract_faces objects, whose
+    "face" is an RGB crop scaled to [0, 1]. Without enforce_detection, an
+    image with no face yields the whole frame with confidence 0.
+    """
+    return get_deepface().extract_faces(
+        img_path=img,
+        detector_backend=DETECTOR_BACKEND,
+        enforce_detection=enforce_detection,
+        align=True
+    )
+
+
+def embed_face(face_obj):
+    """
+    Embed one detected face. Mirrors the per-face part of DeepFace.represent,
+    so detect_faces + embed_face gives the same vector as represent.
+    """
+    model = get_deepface().build_model(MODEL_NAME)
+    return model.forward(_model_input(model, face_obj))
+
+
+def embed_faces(face_objs) -> list:
+    """
+    Embed several detected faces in a single model run, e.g. everyone in
+    a group photo. Same vectors as embed_face on each.
+    """
+    if not face_objs:
+        return []
+    model = get_deepface().build_model(MODEL_NAME)
+    batch = np.concatenate([_model_input(model, face_obj) for face_obj in face_objs])
+    return model.model(batch, training=False).numpy().tolist()
+
+
+def _model_input(model, face_obj):
+    from deepface.modules import preprocessing
+
+    target_size = model.input_shape
+    # rgb to bgr, as represent does
+    img = face_obj["face"][:, :, ::-1]
+    img = preprocessing.resize_image(img=img, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=img, normalization="base")
+
+
+def embed_image_file(img_path: str, timings: dict = None, quality_gate: bool = False,
+                     priority: Priority = Priority.CHECK_IN, deadline: float = None):
+    """
+    Embedding of the first face in an image file, timed per stage
+    (decode, detect, embed) into the stage histograms and `timings`.
+    With quality_gate, poor frames raise FrameQualityError before inference.
+    Detection and embedding run under admission control, which raises
+    Overloaded when `deadline` (monotonic) can't be met.
+    """
+    with timed("decode", timings):
+        img = decode_image(img_path)
+    if quality_gate:
+        with timed("quality", timings):
+            face_quality.check_frame(img)
+    # Enrollment has its own service time so it doesn't skew check-in estimates
+    kind = "verify" if priority == Priority.CHECK_IN else "enroll"
+    with inference_slot(priority, deadline, timings, kind):
+        with timed("detect", timings):
+            faces = detect_faces(img)
+        if quality_gate:
+            face_quality.check_face(faces[0])
+        with timed("embed", timings):
+            return embed_face(faces[0])
+
+
+def warm_up():
+    """
+    Import DeepFace and build the embedding model ahead of the first request.
+    """
+    get_deepface().build_model(MODEL_NAME)
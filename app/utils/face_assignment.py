@@ -0,0 +1,31 @@
+from typing import Dict, List, Sequence
+
+from app.utils.vector_store import Match
+
+
+def assign_faces(matches_per_face: Sequence[List[Match]], threshold: float) -> Dict[int, Match]:
+    """
+    One-to-one assignment of faces to users: each face gets at most one
+    user and each user at most one face. Candidate pairs above `threshold`
+    are taken most similar first, so when two faces resemble the same
+    student the closer one claims them and the other falls back to its
+    next candidate. Returns {face index: match}.
+    """
+    candidates = []
+    for face_index, matches in enumerate(matches_per_face):
+        best_per_user = {}
+        # A user may have several enrolled images; their best one counts
+        for match in matches:
+            best = best_per_user.get(match.user_id)
+            if match.score > threshold and (best is None or match.score > best.score):
+                best_per_user[match.user_id] = match
+        candidates.extend((face_index, match) for match in best_per_user.values())
+
+    assigned = {}
+    claimed_users = set()
+    for face_index, match in sorted(candidates, key=lambda candidate: candidate[1].score, reverse=True):
+        if face_index in assigned or match.user_id in claimed_users:
+            continue
+        assigned[face_index] = match
+        claimed_users.add(match.user_id)
+    return assigned
@@ -0,0 +1,75 @@
+"""
+Facenet512 embeddings on onnxruntime instead of Keras/TensorFlow, from the
+same weights exported (and optionally quantized) by
+benchmarks/export_facenet_onnx.py. Needs the optional onnxruntime package.
+
+Experimental and not used by the app: only the benchmarks load it. It can
+become a setting once benchmarks/face_backend_parity.py has passed on a
+representative set of enrolled faces and its --output is committed;
+benchmarks/face_onnx_preprocess.py checks the input preparation.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+# Facenet512 input size (height, width)
+INPUT_SIZE = (160, 160)
+
+_lock = threading.Lock()
+_sessions = {}  # model path -> InferenceSession
+
+
+def get_session(model_path: str, threads: int = 0):
+    """
+    Load an exported model on first use. `threads` is onnxruntime's
+    intra-op thread count, 0 for its default.
+    """
+    with _lock:
+        if model_path not in _sessions:
+            try:
+                import onnxruntime
+            except ImportError as e:
+                raise RuntimeError("The ONNX embedding backend requires the onnxruntime package") from e
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if threads:
+                options.intra_op_num_threads = threads
+            _sessions[model_path] = onnxruntime.InferenceSession(
+                model_path, options, providers=["CPUExecutionProvider"]
+            )
+        return _sessions[model_path]
+
+
+def preprocess(face_obj) -> np.ndarray:
+    """
+    A detected face as Facenet512 input, exactly as DeepFace's
+    preprocessing.resize_image prepares it: BGR, scaled to fit 160x160,
+    centered on black padding, float32 in [0, 1].
+    """
+    # rgb to bgr, as represent does
+    img = face_obj["face"][:, :, ::-1]
+    factor = min(INPUT_SIZE[0] / img.shape[0], INPUT_SIZE[1] / img.shape[1])
+    img = cv2.resize(img, (int(img.shape[1] * factor), int(img.shape[0] * factor)))
+    pad_height = INPUT_SIZE[0] - img.shape[0]
+    pad_width = INPUT_SIZE[1] - img.shape[1]
+    img = np.pad(
+        img,
+        ((pad_height // 2, pad_height - pad_height // 2), (pad_width // 2, pad_width - pad_width // 2), (0, 0)),
+        "constant",
+    )
+    if img.shape[:2] != INPUT_SIZE:
+        img = cv2.resize(img, INPUT_SIZE)
+    img = img.astype(np.float32)
+    if img.max() > 1:
+        img /= 255.0
+    return img
+
+
+def embed_faces(face_objs, model_path: str) -> np.ndarray:
+    """
+    Embeddings of detected faces, one row per face, in a single run.
+    """
+    session = get_session(model_path)
+    batch = np.stack([preprocess(face_obj) for face_obj in face_objs])
+    return session.run(None, {session.get_inputs()[0].name: batch})[0]
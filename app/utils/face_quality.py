@@ -0,0 +1,68 @@
+import cv2
+
+from app.core.config import settings
+from app.core.metrics import FACE_QUALITY, FRAME_QUALITY
+
+# Frames are scored at this width so sharpness doesn't depend on camera resolution
+_SCORING_WIDTH = 320
+
+REJECTION_MESSAGES = {
+    "blurry": "Image is too blurry, hold still and retake.",
+    "too_dark": "Image is too dark, improve the lighting and retake.",
+    "too_bright": "Image is overexposed, reduce the lighting and retake.",
+    "face_too_small": "Face is too small, move closer to the camera and retake.",
+}
+
+
+class FrameQualityError(ValueError):
+    """
+    Raised when a frame is rejected before inference. `reason` is one of
+    the REJECTION_MESSAGES keys.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(REJECTION_MESSAGES[reason])
+        self.reason = reason
+
+
+def frame_quality(img):
+    """
+    Sharpness (variance of the Laplacian) and brightness (mean gray level)
+    of a BGR frame.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    if width > _SCORING_WIDTH:
+        gray = cv2.resize(gray, (_SCORING_WIDTH, round(height * _SCORING_WIDTH / width)),
+                          interpolation=cv2.INTER_AREA)
+    return cv2.Laplacian(gray, cv2.CV_64F).var(), gray.mean()
+
+
+def check_frame(img):
+    """
+    Reject blurry, dark or overexposed frames before face detection.
+    """
+    sharpness, brightness = frame_quality(img)
+    if brightness < settings.QUALITY_MIN_BRIGHTNESS:
+        _reject("too_dark")
+    if brightness > settings.QUALITY_MAX_BRIGHTNESS:
+        _reject("too_bright")
+    if sharpness < settings.QUALITY_MIN_SHARPNESS:
+        _reject("blurry")
+    FRAME_QUALITY.labels("accepted").inc()
+
+
+def check_face(face_obj):
+    """
+    Reject a detected face that is too small to embed reliably. Counted
+    per face, apart from the frame outcomes.
+    """
+    area = face_obj["facial_area"]
+    if min(area["w"], area["h"]) < settings.QUALITY_MIN_FACE_SIZE:
+        _reject("face_too_small", FACE_QUALITY)
+    FACE_QUALITY.labels("accepted").inc()
+
+
+def _reject(reason: str, counter=FRAME_QUALITY):
+    counter.labels(reason).inc()
+    raise FrameQualityError(reason)
@@ -0,0 +1,126 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+
+def iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """
+    Intersection over union of two (x, y, w, h) boxes.
+    """
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union else 0.0
+
+
+@dataclass
+class Track:
+    id: int
+    box: Tuple[int, int, int, int]
+    # IoU with the previous frame, scaled down when the detector is less
+    # sure of the face than it was when the track was last embedded
+    confidence: float = 1.0
+    reference_confidence: float = 1.0
+    user_id: Optional[int] = None
+    similarity_score: Optional[float] = None
+    misses: int = 0
+    frames_since_embedding: int = 0
+    face: dict = field(default=None, repr=False)
+
+
+class FaceTracker:
+    """
+    Follows faces across the frames of one camera stream by bounding-box IoU,
+    so a face only needs to be embedded when it first appears, when its
+    track confidence drops (fast motion, occlusion, a different face taking
+    its place) or, while still unrecognized, every `retry_frames` frames.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, min_confidence: float = 0.5,
+                 max_misses: int = 5, retry_frames: int = 15):
+        self.iou_threshold = iou_threshold
+        self.min_confidence = min_confidence
+        self.max_misses = max_misses
+        self.retry_frames = retry_frames
+        self.tracks: Dict[int, Track] = {}
+        self._ids = count(1)
+
+    def update(self, detections: List[dict]):
+        """
+        Match this frame's detections (DeepFace.extract_faces objects) to the
+        existing tracks. Returns (tracks that need an embedding, tracks lost).
+        """
+        boxes = [self._box(d) for d in detections]
+
+        # Greedy matching, best overlap first
+        pairs = sorted(
+            ((iou(track.box, box), track_id, index)
+             for track_id, track in self.tracks.items()
+             for index, box in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_detections = set(), set()
+        needs_embedding = []
+        for overlap, track_id, index in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track_id in matched_tracks or index in matched_detections:
+                continue
+            matched_tracks.add(track_id)
+            matched_detections.add(index)
+
+            track = self.tracks[track_id]
+            track.box = boxes[index]
+            track.face = detections[index]
+            detector_ratio = self._detector_confidence(detections[index]) / track.reference_confidence
+            track.confidence = overlap * min(1.0, detector_ratio)
+            track.misses = 0
+            track.frames_since_embedding += 1
+            if (track.confidence < self.min_confidence
+                    or (track.user_id is None and track.frames_since_embedding >= self.retry_frames)):
+                needs_embedding.append(track)
+
+        for index, detection in enumerate(detections):
+            if index in matched_detections:
+                continue
+            track = Track(id=next(self._ids), box=boxes[index], face=detection)
+            self.tracks[track.id] = track
+            matched_tracks.add(track.id)
+            needs_embedding.append(track)
+
+        # Tracks without a detection this frame are dropped after max_misses frames
+        lost = []
+        for track_id in list(self.tracks):
+            if track_id in matched_tracks:
+                continue
+            track = self.tracks[track_id]
+            track.misses += 1
+            if track.misses > self.max_misses:
+                lost.append(self.tracks.pop(track_id))
+        return needs_embedding, lost
+
+    def settled(self) -> bool:
+        """
+        Whether every face in view is recognized (or none is), so nothing is
+        left to decide until a new face appears.
+        """
+        return all(track.user_id is not None and not track.misses for track in self.tracks.values())
+
+    def mark_embedded(self, track: Track, user_id: Optional[int], similarity_score: Optional[float]):
+        track.frames_since_embedding = 0
+        track.confidence = 1.0
+        track.reference_confidence = self._detector_confidence(track.face)
+        track.user_id = user_id
+        track.similarity_score = similarity_score
+
+    @staticmethod
+    def _detector_confidence(detection: dict) -> float:
+        return detection.get("confidence") or 1.0
+
+    @staticmethod
+    def _box(detection: dict) -> Tuple[int, int, int, int]:
+        area = detection["facial_area"]
+        return area["x"], area["y"], area["w"], area["h"]
@@ -1,30 +1,47 @@
 import os
-from pinecone import Pinecone, ServerlessSpec
+import threading
 
-api_key = os.environ.get("PINECONE_API_KEY")
-region = os.environ.get("PINECONE_REGION")
+index_name = "face-recognition"
+dimension = 512
 
-if not api_key or not region:
-    raise ValueError("PINECONE_API_KEY and PINECONE_REGION must be set in environment variables")
+_lock = threading.Lock()
+pinecone_index = None
 
-pc = Pinecone(api_key=api_key)
 
-index_name = "face-recognition"
-dimension = 512
+def _connect():
+    # Imported here so workers that never touch faces don't pay for the client
+    from pinecone import Pinecone, ServerlessSpec
 
-existing_indexes = pc.list_indexes().names()
-if index_name not in existing_indexes:
-    pc.create_index(
-        name=index_name,
-        dimension=dimension,
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region=region
+    api_key = os.environ.get("PINECONE_API_KEY")
+    region = os.environ.get("PINECONE_REGION")
+
+    if not api_key or not region:
+        raise ValueError("PINECONE_API_KEY and PINECONE_REGION must be set in environment variables")
+
+    pc = Pinecone(api_key=api_key)
+
+    existing_indexes = pc.list_indexes().names()
+    if index_name not in existing_indexes:
+        pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud="aws",
+                region=region
+            )
         )
-    )
 
-pinecone_index = pc.Index(index_name)
+    return pc.Index(index_name)
+
 
 def get_pinecone_index():
+    """
+    Return the Pinecone index, connecting (and creating it if missing) on first use.
+    """
+    global pinecone_index
+    if pinecone_index is None:
+        with _lock:
+            if pinecone_index is None:
+                pinecone_index = _connect()
     return pinecone_index
@@ -0,0 +1,254 @@
+import fcntl
+import json
+import os
+import threading
+import uuid
+from collections import namedtuple
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.pinecone_face import get_pinecone_index, dimension
+
+Match = namedtuple("Match", ["vector_id", "user_id", "score"])
+
+# One published version of the local gallery; swapped as a whole on reload
+Gallery = namedtuple("Gallery", ["matrix", "user_ids", "vector_ids", "rows_by_user"])
+
+# Pinecone accepts at most 1000 ids per delete request
+DELETE_BATCH_SIZE = 1000
+
+
+class PineconeVectorStore:
+    """
+    Face gallery stored in the hosted Pinecone index.
+    """
+
+    def query(self, vector, top_k: int = 10, user_ids: Optional[Iterable[int]] = None):
+        """
+        Nearest enrolled faces, optionally only among `user_ids` (a metadata
+        filter, so Pinecone only scores the candidates).
+        """
+        result = get_pinecone_index().query(
+            vector=list(vector),
+            top_k=top_k,
+            include_metadata=True,
+            filter=None if user_ids is None else {"user_id": {"$in": list(user_ids)}}
+        )
+        return [
+            Match(match["id"], int(match["metadata"]["user_id"]), match["score"])
+            for match in result["matches"]
+        ]
+
+    def query_many(self, vectors, top_k: int = 10, user_ids: Optional[Iterable[int]] = None):
+        """
+        query() for each vector; Pinecone has no batched query.
+        """
+        user_ids = None if user_ids is None else list(user_ids)
+        return [self.query(vector, top_k, user_ids) for vector in vectors]
+
+    def upsert(self, vector_id: str, embedding, user_id: int):
+        get_pinecone_index().upsert([(vector_id, list(embedding), {"user_id": user_id})])
+
+    def delete(self, vector_ids):
+        vector_ids = list(vector_ids)
+        for start in range(0, len(vector_ids), DELETE_BATCH_SIZE):
+            get_pinecone_index().delete(ids=vector_ids[start:start + DELETE_BATCH_SIZE])
+
+    def warm_up(self):
+        get_pinecone_index()
+
+
+class LocalVectorStore:
+    """
+    Face gallery kept on local disk as a memory-mapped float32 matrix of
+    L2-normalized embeddings, searched by brute-force cosine similarity.
+
+    The matrix is opened with mmap, so every worker on the host maps the same
+    page-cache pages instead of holding its own copy. Writers produce a new
+    embeddings file and then atomically replace the manifest that points at
+    it; readers notice the new manifest on their next query and remap. The
+    previous embeddings file is only removed by the publish after that, so a
+    reader that has just read the old manifest can still open it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self._lock = threading.Lock()
+        self._version = None
+        self._gallery = Gallery(np.empty((0, dimension), dtype=np.float32), np.empty(0, dtype=np.int64), [], {})
+
+    def _manifest_version(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _snapshot(self) -> Gallery:
+        version = self._manifest_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._load(version)
+        # A single attribute read, so a query never mixes two versions
+        return self._gallery
+
+    def _load(self, version, attempts: int = 3):
+        if version is None:
+            return
+        for attempt in range(attempts):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            try:
+                matrix = np.load(os.path.join(self.path, manifest["embeddings"]), mmap_mode="r")
+                break
+            except FileNotFoundError:
+                # Two publishes since the manifest was read; read it again
+                if attempt == attempts - 1:
+                    raise
+        rows_by_user = {}
+        for row, user_id in enumerate(manifest["user_ids"]):
+            rows_by_user.setdefault(user_id, []).append(row)
+        self._gallery = Gallery(matrix, np.asarray(manifest["user_ids"], dtype=np.int64),
+                                manifest["vector_ids"], rows_by_user)
+        self._version = version
+
+    def query(self, vector, top_k: int = 10, user_ids: Optional[Iterable[int]] = None):
+        """
+        Nearest enrolled faces, optionally only among `user_ids`. Scoped
+        queries gather just the candidates' rows, so their cost follows the
+        candidate count rather than the gallery size.
+        """
+        return self.query_many([vector], top_k, user_ids)[0]
+
+    def query_many(self, vectors, top_k: int = 10, user_ids: Optional[Iterable[int]] = None):
+        """
+        query() for several vectors at once, scored in a single matrix product.
+        """
+        matrix, all_user_ids, vector_ids, rows_by_user = self._snapshot()
+        if user_ids is None:
+            rows = None
+        else:
+            rows = np.fromiter(
+                (row for user_id in user_ids for row in rows_by_user.get(user_id, ())),
+                dtype=np.int64,
+            )
+            matrix = matrix[rows]
+        if not len(matrix) or not len(vectors):
+            return [[] for _ in vectors]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        all_scores = matrix @ (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).T
+        k = min(top_k, len(all_scores))
+        results = []
+        for scores in all_scores.T:
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            scores = scores[best]
+            if rows is not None:
+                best = rows[best]
+            results.append([Match(vector_ids[i], int(all_user_ids[i]), float(score))
+                            for i, score in zip(best, scores)])
+        return results
+
+    def upsert(self, vector_id: str, embedding, user_id: int):
+        self.write_many([(vector_id, embedding, user_id)])
+
+    def write_many(self, items):
+        """
+        Insert or replace (vector_id, embedding, user_id) items in one rewrite
+        of the gallery. Serialized across processes with a file lock.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "gallery.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            matrix, user_ids, vector_ids, _ = self._snapshot()
+            rows = {vid: i for i, vid in enumerate(vector_ids)}
+            matrix = np.array(matrix, dtype=np.float32)
+            user_ids = user_ids.tolist()
+            vector_ids = list(vector_ids)
+
+            new_rows = []
+            for vector_id, embedding, user_id in items:
+                embedding = np.asarray(embedding, dtype=np.float32)
+                embedding = embedding / np.linalg.norm(embedding)
+                if vector_id in rows:
+                    matrix[rows[vector_id]] = embedding
+                    user_ids[rows[vector_id]] = user_id
+                else:
+                    rows[vector_id] = len(vector_ids) + len(new_rows)
+                    new_rows.append(embedding)
+                    vector_ids.append(vector_id)
+                    user_ids.append(user_id)
+            if new_rows:
+                matrix = np.vstack([matrix, np.stack(new_rows)])
+
+            self._publish(matrix, vector_ids, user_ids)
+
+    def delete(self, vector_ids):
+        """
+        Remove vectors in one rewrite of the gallery.
+        """
+        removed = set(vector_ids)
+        if not removed:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "gallery.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            matrix, user_ids, vector_ids, _ = self._snapshot()
+            keep = [i for i, vector_id in enumerate(vector_ids) if vector_id not in removed]
+            if len(keep) == len(vector_ids):
+                return
+            self._publish(
+                np.array(matrix[keep], dtype=np.float32).reshape(len(keep), dimension),
+                [vector_ids[i] for i in keep],
+                user_ids[keep].tolist(),
+            )
+
+    def _publish(self, matrix, vector_ids, user_ids):
+        previous = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                previous = json.load(f)["embeddings"]
+
+        # Files older than the current one can no longer be reached through
+        # any manifest; the current one stays for readers that just read it.
+        # Processes that still map a removed file keep its pages until they remap
+        for name in os.listdir(self.path):
+            if name.startswith("embeddings-") and name.endswith(".npy") and name != previous:
+                os.unlink(os.path.join(self.path, name))
+
+        embeddings_name = f"embeddings-{uuid.uuid4().hex}.npy"
+        np.save(os.path.join(self.path, embeddings_name), matrix)
+        manifest_tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(manifest_tmp, "w") as f:
+            json.dump({"embeddings": embeddings_name, "vector_ids": vector_ids, "user_ids": user_ids}, f)
+        os.replace(manifest_tmp, self.manifest_path)
+
+    def warm_up(self):
+        matrix = self._snapshot()[0]
+        # Fault the pages in once, ahead of forking workers
+        if len(matrix):
+            float(np.asarray(matrix).sum())
+
+
+_lock = threading.Lock()
+_vector_store = None
+
+
+def get_vector_store():
+    """
+    Return the configured face gallery backend (VECTOR_STORE=pinecone|local).
+    """
+    global _vector_store
+    if _vector_store is None:
+        with _lock:
+            if _vector_store is None:
+                if settings.VECTOR_STORE == "local":
+                    _vector_store = LocalVectorStore(settings.FACE_GALLERY_PATH)
+                elif settings.VECTOR_STORE == "pinecone":
+                    _vector_store = PineconeVectorStore()
+                else:
+                    raise ValueError(f"Unknown VECTOR_STORE: {settings.VECTOR_STORE}")
+    return _vector_store
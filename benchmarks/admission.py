@@ -0,0 +1,83 @@
+"""
+Checks of the inference admission gate with sleeps standing in for model
+runs, under the configured concurrency and deadlines:
+
+    python -m benchmarks.admission
+
+- a group photo arriving while a 2.5 s group run holds the slot is queued
+  behind it, not turned away;
+- once that run is done, a single-face check-in is admitted straight away
+  even though group runs take longer than its whole deadline;
+- a slow cold first run doesn't inflate the estimates.
+
+Fails (exit 1) if any of them doesn't hold. Takes about ten seconds.
+"""
+import os
+import sys
+import threading
+import time
+
+from benchmarks.common import offline_env
+
+os.environ.update(offline_env("sqlite://"))
+
+from app.core.config import settings
+from app.utils.admission import (InferenceGate, Overloaded, Priority, check_in_deadline,
+                                 group_check_in_deadline)
+
+GROUP_RUN_SECONDS = 2.5
+
+
+def run(gate, kind, seconds, deadline):
+    """
+    One request: wait for a slot, "infer" for `seconds`. Returns the
+    status it would get, 200 or the Overloaded status code.
+    """
+    try:
+        gate.acquire(Priority.CHECK_IN, deadline, kind)
+    except Overloaded as e:
+        return e.status_code
+    start = time.monotonic()
+    time.sleep(seconds)
+    gate.release(kind, time.monotonic() - start)
+    return 200
+
+
+def main():
+    gate = InferenceGate(settings.INFERENCE_CONCURRENCY, settings.INFERENCE_QUEUE_DEPTH)
+    failures = []
+
+    # Cold first runs, as when the model is loaded on the first request
+    run(gate, "group", 3 * GROUP_RUN_SECONDS, group_check_in_deadline())
+    run(gate, "verify", 3 * settings.INFERENCE_DEADLINE_SECONDS, check_in_deadline())
+    if gate.service_times:
+        failures.append(f"cold runs counted in the estimates: {gate.service_times}")
+
+    # Prime the group estimate, then queue a second group behind a running one
+    run(gate, "group", GROUP_RUN_SECONDS, group_check_in_deadline())
+    statuses = {}
+    running = threading.Thread(target=lambda: statuses.update(
+        first=run(gate, "group", GROUP_RUN_SECONDS, group_check_in_deadline())))
+    running.start()
+    time.sleep(0.1)
+    statuses["second"] = run(gate, "group", 0.1, group_check_in_deadline())
+    running.join()
+    print(f"group behind a {GROUP_RUN_SECONDS} s group run: {statuses['second']}")
+    if statuses != {"first": 200, "second": 200}:
+        failures.append(f"back-to-back group requests got {statuses}")
+
+    status = run(gate, "verify", 0.1, check_in_deadline())
+    print(f"check-in on the idle gate after group runs: {status}")
+    if status != 200:
+        failures.append(f"check-in on an idle gate got {status}")
+
+    print(f"service time estimates: { {kind: round(s, 2) for kind, s in gate.service_times.items()} }")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("admission checks passed")
+
+
+if __name__ == "__main__":
+    main()
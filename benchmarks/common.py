@@ -0,0 +1,23 @@
+import os
+
+# Settings without defaults that the benchmarks never actually use
+_PLACEHOLDER_SETTINGS = ("SECRET_KEY", "PINECONE_API_KEY", "PINECONE_REGION",
+                         "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB")
+
+
+def offline_env(database_url: str, **overrides) -> dict:
+    """
+    Environment for running the app against a local database without any
+    network access: the current environment plus placeholders for required
+    settings, the given database URL and no log file.
+    """
+    env = dict(os.environ)
+    for name in _PLACEHOLDER_SETTINGS:
+        env.setdefault(name, "benchmark")
+    env.update({
+        "NEON_DATABASE_URL": database_url,
+        "DATABASE_URL": database_url,
+        "LOG_FILE": "",
+    })
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
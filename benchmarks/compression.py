@@ -0,0 +1,112 @@
+"""
+Payload size and latency of the list and history endpoints in each
+response encoding: JSON or MessagePack (negotiated with Accept), each
+plain or gzipped (Accept-Encoding).
+
+Seeds a scratch SQLite database, starts the app with uvicorn and fetches
+each endpoint sequentially, so latencies include compression and
+decompression but no queueing. Transfer time over a slow mobile link is
+estimated from the bytes on the wire:
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --link-kbps 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.common import offline_env
+from benchmarks.loadtest import PORT, wait_ready
+
+ENCODINGS = {
+    "json": {"Accept": "application/json", "Accept-Encoding": "identity"},
+    "json+gzip": {"Accept": "application/json", "Accept-Encoding": "gzip"},
+    "msgpack": {"Accept": "application/msgpack", "Accept-Encoding": "identity"},
+    "msgpack+gzip": {"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+}
+
+
+def build_endpoints(data, tokens):
+    admin = {"Authorization": f"Bearer {tokens['admin']}"}
+    parent_id = data.ids["parent"][0]
+    parent = {"Authorization": f"Bearer {tokens[parent_id]}"}
+    child_id = data.children_of[parent_id][0]
+    return {
+        "child_history": (f"/api/v1/attendances/child/{child_id}/attendance", parent),
+        "users_list_100": ("/api/v1/users/users/?limit=100", admin),
+        "users_list_5": ("/api/v1/users/users/?limit=5", admin),
+        "attendances_list_100": ("/api/v1/attendances/?limit=100", admin),
+        "user_search": ("/api/v1/users/users/search?q=first1&limit=20", admin),
+    }
+
+
+def measure(client, url, headers, requests: int):
+    latencies = []
+    wire_bytes = body_bytes = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        wire_bytes = response.num_bytes_downloaded
+        body_bytes = len(response.content)
+    p50, p95 = np.percentile(np.asarray(latencies) * 1000, [50, 95])
+    return wire_bytes, body_bytes, float(p50), float(p95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--history-days", type=int, default=120)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and encoding")
+    parser.add_argument("--link-kbps", type=float, default=1000, help="mobile link speed for the transfer estimate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = offline_env(f"sqlite:///{os.path.join(tmp, 'compression.db')}", VECTOR_STORE="local",
+                          FACE_GALLERY_PATH=os.path.join(tmp, "gallery"), LOG_LEVEL="WARNING")
+        os.environ.update(env)
+
+        from app.core.security import create_access_token
+        from app.db.session import Base, SessionLocal, engine
+        from benchmarks.seed import seed
+
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            data = seed(db, users=args.users, history_days=args.history_days, enrolled=0)
+        engine.dispose()
+
+        tokens = {user_id: create_access_token({"sub": str(user_id)})
+                  for user_id in data.ids["parent"][:1] + data.ids["admin"][:1]}
+        tokens["admin"] = tokens[data.ids["admin"][0]]
+        endpoints = build_endpoints(data, tokens)
+
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.server", "--port", str(PORT)], env=env)
+        try:
+            wait_ready(server)
+            results = []
+            with httpx.Client(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+                for name, (url, auth) in endpoints.items():
+                    for encoding, headers in ENCODINGS.items():
+                        headers = {**auth, **headers}
+                        measure(client, url, headers, 5)  # warm up
+                        results.append((name, encoding, *measure(client, url, headers, args.requests)))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'endpoint':<22}{'encoding':<14}{'wire B':>9}{'body B':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'link ms':>9}")
+    for name, encoding, wire_bytes, body_bytes, p50, p95 in results:
+        link_ms = wire_bytes * 8 / args.link_kbps
+        print(f"{name:<22}{encoding:<14}{wire_bytes:>9}{body_bytes:>9}{p50:>9.2f}{p95:>9.2f}{link_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
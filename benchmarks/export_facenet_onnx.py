@@ -0,0 +1,56 @@
+"""
+Export DeepFace's Facenet512 weights to ONNX for app/utils/face_onnx.py,
+optionally with int8 dynamic quantization of the weights:
+
+    python -m benchmarks.export_facenet_onnx models/facenet512.onnx
+    python -m benchmarks.export_facenet_onnx models/facenet512.int8.onnx --quantize
+
+Needs tensorflow (via deepface), tf2onnx and onnxruntime. Check the result
+with benchmarks/face_backend_parity.py before deploying it.
+"""
+import argparse
+import os
+import tempfile
+
+from app.utils import face
+from app.utils.face_onnx import INPUT_SIZE
+
+
+def export(output: str, opset: int):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = face.get_deepface().build_model(face.MODEL_NAME).model
+    # Traced as a plain function so it works with both Keras 2 and 3 models;
+    # a dynamic batch dimension lets several faces share one run
+    signature = [tf.TensorSpec((None, *INPUT_SIZE, 3), tf.float32, name="face")]
+    forward = tf.function(lambda images: model(images, training=False), input_signature=signature)
+    tf2onnx.convert.from_function(forward, input_signature=signature, opset=opset, output_path=output)
+
+
+def quantize(source: str, output: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, output, weight_type=QuantType.QInt8)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output", help="path of the .onnx file to write")
+    parser.add_argument("--quantize", action="store_true", help="int8 weights; smaller, faster, less exact")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    if args.quantize:
+        with tempfile.TemporaryDirectory() as tmp:
+            float_model = os.path.join(tmp, "facenet512.onnx")
+            export(float_model, args.opset)
+            quantize(float_model, args.output)
+    else:
+        export(args.output, args.opset)
+    print(f"wrote {args.output} ({os.path.getsize(args.output) / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Check that the ONNX embedding backend matches DeepFace's Keras Facenet512
+on a directory of face photos, before offering it as a setting:
+
+    python -m benchmarks.face_backend_parity path/to/faces --model models/facenet512.onnx
+    python -m benchmarks.face_backend_parity path/to/faces --model models/facenet512.int8.onnx --tolerance 0.99
+
+Faces are detected once and embedded by both backends. With ONNX switched on,
+/verify embeds the query with ONNX but compares it against a gallery
+enrolled with Keras, so each face's ONNX embedding is scored against the
+others' Keras embeddings and compared with the all-Keras scores. Fails
+(exit 1) if any face's two embeddings have a cosine similarity below
+--tolerance, or if any /verify decision would change: for every query and
+gallery face, whether their similarity clears MATCH_THRESHOLD, and which
+gallery face is each query's best match. With --output the results are
+written as JSON, to keep next to the face set they were measured on.
+
+The ONNX backend is not validated until this passes on a representative
+set of enrolled faces.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from benchmarks.common import offline_env
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def normalized(embeddings) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def decisions(queries: np.ndarray, gallery: np.ndarray, threshold: float):
+    """
+    Match decisions of each query face against every other face in the
+    gallery (a face never matches its own enrolled image).
+    """
+    similarities = queries @ gallery.T
+    np.fill_diagonal(similarities, -np.inf)
+    return similarities > threshold, similarities.argmax(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--model", default="models/facenet512.onnx", help="exported ONNX model")
+    parser.add_argument("--tolerance", type=float, default=0.999,
+                        help="minimum cosine similarity between the backends' embeddings of a face")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.update(offline_env("sqlite://"))
+    from app.api.v1.user import MATCH_THRESHOLD
+    from app.utils import face, face_onnx
+
+    faces, names = [], []
+    for name in sorted(os.listdir(args.directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        try:
+            detected = face.detect_faces(face.decode_image(os.path.join(args.directory, name)))
+        except ValueError as e:
+            print(f"{name}: skipped, {e}")
+            continue
+        faces.extend(detected)
+        names.extend(f"{name}#{index}" for index in range(len(detected)))
+    if len(faces) < 2:
+        parser.error(f"need at least two faces in {args.directory}")
+
+    keras = normalized([face.embed_face(face_obj) for face_obj in faces])
+    onnx = normalized(face_onnx.embed_faces(faces, args.model))
+
+    agreement = (keras * onnx).sum(axis=1)
+    # Before: Keras queries against the Keras gallery. After: ONNX queries against it
+    keras_matches, keras_best = decisions(keras, keras, MATCH_THRESHOLD)
+    onnx_matches, onnx_best = decisions(onnx, keras, MATCH_THRESHOLD)
+    flipped = np.argwhere(keras_matches != onnx_matches)
+    best_changed = np.flatnonzero(keras_best != onnx_best)
+
+    print(f"{len(faces)} faces, {len(faces) * (len(faces) - 1)} query/gallery pairs")
+    print(f"embedding cosine similarity: min {agreement.min():.6f}, mean {agreement.mean():.6f}")
+    print(f"match decisions changed (threshold {MATCH_THRESHOLD}): {len(flipped)}")
+    print(f"best matches changed: {len(best_changed)}")
+
+    failures = [f"{names[i]}: cosine similarity {agreement[i]:.6f}"
+                for i in np.flatnonzero(agreement < args.tolerance)]
+    failures += [f"query {names[i]} vs gallery {names[j]}: match {bool(keras_matches[i, j])} -> "
+                 f"{bool(onnx_matches[i, j])}" for i, j in flipped]
+    failures += [f"{names[i]}: best match {names[keras_best[i]]} -> {names[onnx_best[i]]}" for i in best_changed]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model": os.path.basename(args.model),
+                "faces": len(faces),
+                "threshold": MATCH_THRESHOLD,
+                "tolerance": args.tolerance,
+                "min_similarity": float(agreement.min()),
+                "mean_similarity": float(agreement.mean()),
+                "decisions_changed": len(flipped),
+                "best_matches_changed": len(best_changed),
+                "failures": failures,
+            }, f, indent=2)
+            f.write("\n")
+    if failures:
+        print("\nparity failures:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nbackends agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare the face embedding backends (DeepFace/Keras and ONNX models) on a
+directory of face photos: startup time, memory and embedding latency.
+
+    python -m benchmarks.face_backends path/to/faces --onnx models/facenet512.onnx \
+        --onnx models/facenet512.int8.onnx
+
+Each backend runs in a fresh process, so import costs and memory are
+measured from a clean start. Faces are detected first and only the
+embedding step is timed. RSS is the process's resident memory after the
+model is loaded and all faces embedded; detection (DeepFace, and with it
+TensorFlow) is loaded for every backend, so the difference is the model.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import offline_env
+from benchmarks.face_backend_parity import IMAGE_EXTENSIONS
+from benchmarks.prefork_rss import memory_kb
+
+
+def run_backend(directory: str, repeat: int, model: str = None) -> dict:
+    """
+    Runs in the child process; `model` is the ONNX model, None for DeepFace.
+    """
+    from app.utils import face, face_onnx
+
+    if model is None:
+        load, embed = face.warm_up, face.embed_face
+    else:
+        load, embed = lambda: face_onnx.get_session(model), lambda face_obj: face_onnx.embed_faces([face_obj], model)
+
+    faces = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            try:
+                faces.extend(face.detect_faces(face.decode_image(os.path.join(directory, name))))
+            except ValueError:
+                continue
+    rss_detect, _ = memory_kb(os.getpid())
+
+    started = time.perf_counter()
+    load()
+    embed(faces[0])
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeat):
+        for face_obj in faces:
+            started = time.perf_counter()
+            embed(face_obj)
+            latencies.append(time.perf_counter() - started)
+
+    rss, _ = memory_kb(os.getpid())
+    p50, p95 = np.percentile(np.asarray(latencies) * 1000, [50, 95])
+    return {
+        "faces": len(faces),
+        "load_s": load_seconds,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "model_mib": (rss - rss_detect) / 1024,
+        "rss_mib": rss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--onnx", action="append", default=[], help="exported model to compare; repeatable")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the faces")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-model", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.directory, args.repeat, args.worker_model)))
+        return
+
+    runs = [("deepface", "-")] + [("onnx", model) for model in args.onnx]
+    results = []
+    for backend, model in runs:
+        worker_model = [] if backend == "deepface" else ["--worker-model", model]
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.face_backends", args.directory,
+             "--repeat", str(args.repeat), "--worker", *worker_model],
+            env=offline_env("sqlite://"), check=True, capture_output=True, text=True,
+        ).stdout
+        results.append((backend, model, json.loads(output.strip().splitlines()[-1])))
+
+    baseline = results[0][2]
+    print(f"{'backend':<10}{'model':<32}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>9}"
+          f"{'model MiB':>11}{'RSS MiB':>9}")
+    for backend, model, r in results:
+        speedup = baseline["p50_ms"] / r["p50_ms"]
+        print(f"{backend:<10}{os.path.basename(model):<32}{r['load_s']:>8.2f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{speedup:>8.2f}x{r['model_mib']:>11.0f}{r['rss_mib']:>9.0f}")
+    print(f"\n{baseline['faces']} faces x {args.repeat} passes per backend")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Check that the ONNX backend prepares faces exactly as the Keras path does:
+face_onnx.preprocess against face._model_input (DeepFace's resize_image and
+normalize_input) on synthetic crops of assorted sizes and aspect ratios,
+as floats in [0, 1] like extract_faces returns and as uint8.
+
+    python -m benchmarks.face_onnx_preprocess
+
+Needs deepface, but no model weights or onnxruntime. Fails (exit 1) if any
+crop's inputs differ by more than --tolerance.
+"""
+import argparse
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import offline_env
+
+os.environ.update(offline_env("sqlite://"))
+
+from app.utils import face, face_onnx
+
+# (height, width): square, portrait, landscape, tiny, larger than the input, odd sizes
+SHAPES = [(160, 160), (200, 150), (150, 200), (24, 31), (480, 360), (161, 97), (97, 161), (1, 40), (333, 333)]
+
+
+def crops(rng):
+    for height, width in SHAPES:
+        pixels = rng.random((height, width, 3))
+        yield f"{height}x{width} float", pixels
+        yield f"{height}x{width} uint8", (pixels * 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="largest allowed absolute difference")
+    args = parser.parse_args()
+
+    # _model_input only reads the model's input shape
+    model = SimpleNamespace(input_shape=face_onnx.INPUT_SIZE[::-1])
+    rng = np.random.default_rng(0)
+    failures = []
+    for name, pixels in crops(rng):
+        face_obj = {"face": pixels}
+        keras = face._model_input(model, face_obj)[0]
+        onnx = face_onnx.preprocess(face_obj)
+        if keras.shape != onnx.shape:
+            failures.append(f"{name}: shape {keras.shape} vs {onnx.shape}")
+            continue
+        difference = float(np.abs(keras.astype(np.float64) - onnx).max())
+        print(f"{name:<16} max difference {difference:.2e}")
+        if difference > args.tolerance:
+            failures.append(f"{name}: max difference {difference:.2e}")
+
+    if failures:
+        print("\npreprocessing differs:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\npreprocessing matches")
+
+
+if __name__ == "__main__":
+    main()
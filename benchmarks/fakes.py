@@ -0,0 +1,59 @@
+"""
+Offline stand-ins for the face model, so benchmarks run without TensorFlow
+or network access. Image decoding is real; detection returns the whole
+frame as the face and the "embedding" is derived from its pixels. The face
+gallery uses the real local vector store.
+"""
+import hashlib
+
+import cv2
+import numpy as np
+
+from app.utils import face
+
+
+def _embedding_from_pixels(pixels: np.ndarray):
+    seed = int.from_bytes(hashlib.sha256(np.ascontiguousarray(pixels).tobytes()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(512)
+
+
+def stub_embedding(image: bytes):
+    """
+    Deterministic 512-d "embedding" of a JPEG: the same image always maps to
+    the same vector, different images to unrelated ones.
+    """
+    return _embedding_from_pixels(cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR))
+
+
+def stub_detect_faces(img, enforce_detection: bool = True):
+    height, width = img.shape[:2]
+    return [{
+        "face": img[:, :, ::-1] / 255,
+        "facial_area": {"x": 0, "y": 0, "w": width, "h": height},
+        "confidence": 1.0,
+    }]
+
+
+def stub_embed_face(face_obj):
+    pixels = np.rint(face_obj["face"][:, :, ::-1] * 255).astype(np.uint8)
+    return _embedding_from_pixels(pixels).tolist()
+
+
+def stub_embed_faces(face_objs):
+    return [stub_embed_face(face_obj) for face_obj in face_objs]
+
+
+def install():
+    face.detect_faces = stub_detect_faces
+    face.embed_face = stub_embed_face
+    face.embed_faces = stub_embed_faces
+
+
+def fake_image(seed: int) -> bytes:
+    """
+    A small, valid JPEG that is unique per seed.
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, size=(160, 160, 3), dtype=np.uint8)
+    ok, buffer = cv2.imencode(".jpg", image)
+    return buffer.tobytes()
@@ -0,0 +1,195 @@
+"""
+Python-side cost of the lookups that run on nearly every request, built per
+call with the legacy db.query() API versus the cached lambda statements in
+app/crud: the user lookup behind get_current_user, the parent/teacher link
+checks, and the rosters and today's attendances of the "today" endpoints.
+
+Runs against an in-memory SQLite database, so no network is needed:
+
+    python -m benchmarks.hot_statements
+
+Time spent inside the driver (between before_cursor_execute and
+after_cursor_execute) is subtracted, leaving statement construction, cache
+lookup, parameter binding and result processing. Each call gets a fresh
+identity map, as each request gets a fresh session. The results of both
+versions are compared before timing.
+"""
+import os
+import random
+import time
+from datetime import datetime
+
+from benchmarks.common import offline_env
+
+os.environ.update(offline_env("sqlite://"))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import load_only, sessionmaker
+
+from app.crud.attendance import get_attendances_on_day
+from app.crud.parent_child import get_child_ids_of_parent, is_parent_of
+from app.crud.teacher_student import get_student_ids_of_teacher, is_teacher_of
+from app.crud.user import USER_OUT_COLUMNS, get_user
+from app.db.session import Base
+from app.models import Attendance, ParentChild, TeacherStudent, User
+from benchmarks.seed import seed
+
+CALLS = 2_000
+REPEAT = 5
+
+
+# The same lookups as they were written before, one Query built per call
+def legacy_get_user(db, user_id):
+    return (
+        db.query(User)
+        .options(load_only(*USER_OUT_COLUMNS, raiseload=True))
+        .filter(User.id == user_id)
+        .first()
+    )
+
+
+def legacy_is_parent_of(db, parent_id, child_id):
+    return db.query(ParentChild).filter_by(parent_id=parent_id, child_id=child_id).first() is not None
+
+
+def legacy_is_teacher_of(db, teacher_id, student_id):
+    return db.query(TeacherStudent).filter_by(teacher_id=teacher_id, student_id=student_id).first() is not None
+
+
+def legacy_child_ids_of_parent(db, parent_id):
+    return [row.id for row in
+            db.query(User.id, User.first_name, User.last_name)
+            .join(ParentChild, ParentChild.child_id == User.id)
+            .filter(ParentChild.parent_id == parent_id)]
+
+
+def legacy_student_ids_of_teacher(db, teacher_id):
+    return [row.id for row in
+            db.query(User.id)
+            .join(TeacherStudent, TeacherStudent.student_id == User.id)
+            .filter(TeacherStudent.teacher_id == teacher_id)]
+
+
+def legacy_attendances_on_day(db, user_ids, day):
+    return db.query(Attendance).filter(Attendance.user_id.in_(user_ids), Attendance.day == day).all()
+
+
+def requests(data, today):
+    """
+    Request name -> (legacy, cached) functions of (db, user) doing that
+    request's lookups, and the users to call them for.
+    """
+    parents = [p for p in data.ids["parent"] if data.children_of[p]]
+    teachers = data.ids["teacher"]
+    return {
+        "authenticate": (
+            lambda db, user_id: legacy_get_user(db, user_id),
+            lambda db, user_id: get_user(db, user_id),
+            data.ids["student"],
+        ),
+        "child attendance (parent)": (
+            lambda db, parent_id: (legacy_get_user(db, parent_id),
+                                   legacy_is_parent_of(db, parent_id, data.children_of[parent_id][0])),
+            lambda db, parent_id: (get_user(db, parent_id),
+                                   is_parent_of(db, parent_id, data.children_of[parent_id][0])),
+            parents,
+        ),
+        "student attendance (teacher)": (
+            lambda db, teacher_id: (legacy_get_user(db, teacher_id),
+                                    legacy_is_teacher_of(db, teacher_id, data.students_of[teacher_id][0])),
+            lambda db, teacher_id: (get_user(db, teacher_id),
+                                    is_teacher_of(db, teacher_id, data.students_of[teacher_id][0])),
+            teachers,
+        ),
+        "today (parent)": (
+            lambda db, parent_id: (legacy_get_user(db, parent_id), legacy_attendances_on_day(
+                db, legacy_child_ids_of_parent(db, parent_id), today)),
+            lambda db, parent_id: (get_user(db, parent_id), get_attendances_on_day(
+                db, get_child_ids_of_parent(db, parent_id), today)),
+            parents,
+        ),
+        "today (teacher)": (
+            lambda db, teacher_id: (legacy_get_user(db, teacher_id), legacy_attendances_on_day(
+                db, legacy_student_ids_of_teacher(db, teacher_id), today)),
+            lambda db, teacher_id: (get_user(db, teacher_id), get_attendances_on_day(
+                db, get_student_ids_of_teacher(db, teacher_id), today)),
+            teachers,
+        ),
+    }
+
+
+def comparable(result):
+    """
+    Results as plain values: entities by primary key, id lists as sets.
+    """
+    if isinstance(result, tuple):
+        return tuple(comparable(item) for item in result)
+    if isinstance(result, list):
+        return frozenset(comparable(item) for item in result)
+    if isinstance(result, (User, Attendance)):
+        return result.id
+    return result
+
+
+class DriverTimer:
+    """
+    Accumulates the time spent inside cursor.execute.
+    """
+
+    def __init__(self, engine):
+        self.total = 0.0
+        self._started = None
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, *args):
+        self._started = time.perf_counter()
+
+    def _after(self, *args):
+        self.total += time.perf_counter() - self._started
+
+
+def measure(db, timer, fn, users):
+    """
+    Best per-call Python time in microseconds over REPEAT runs of CALLS calls.
+    """
+    best = float("inf")
+    for _ in range(REPEAT):
+        timer.total = 0.0
+        started = time.perf_counter()
+        for user_id in users:
+            fn(db, user_id)
+            db.expunge_all()
+        elapsed = time.perf_counter() - started - timer.total
+        best = min(best, elapsed / len(users))
+    return best * 1e6
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    data = seed(db, users=2_000, history_days=5)
+    timer = DriverTimer(engine)
+    today = datetime.now().date()
+    rng = random.Random(0)
+
+    print(f"{'request':<32}{'legacy us':>11}{'cached us':>11}{'saved':>9}")
+    for name, (legacy, cached, candidates) in requests(data, today).items():
+        users = [rng.choice(candidates) for _ in range(CALLS)]
+        for user_id in set(users):
+            assert comparable(legacy(db, user_id)) == comparable(cached(db, user_id)), (name, user_id)
+            db.expunge_all()
+        # Warm both statement caches before timing
+        measure(db, timer, legacy, users[:50])
+        measure(db, timer, cached, users[:50])
+        before = measure(db, timer, legacy, users)
+        after = measure(db, timer, cached, users)
+        print(f"{name:<32}{before:>11.1f}{after:>11.1f}{1 - after / before:>9.0%}")
+    print(f"\nPython time per request's lookups, excluding the driver; best of {REPEAT} x {CALLS} calls")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
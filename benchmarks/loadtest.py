@@ -0,0 +1,258 @@
+"""
+Offline load test for the API.
+
+Seeds a scratch database (SQLite by default, or a local Postgres given with
+--database-url) with thousands of users, relationships and attendance rows,
+enrolls faces into a local gallery using a stub embedding model, starts the
+app with uvicorn and drives the hot endpoints at the given concurrency.
+
+Reports throughput and p50/p95/p99 per scenario and compares them with the
+stored baselines, exiting non-zero on a regression:
+
+    python -m benchmarks.loadtest                  # compare with baselines.json
+    python -m benchmarks.loadtest --save-baseline  # record new baselines
+
+Baselines are only comparable on the same machine and database; record them
+once per environment. The database given with --database-url is dropped and
+recreated.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from benchmarks.common import offline_env
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+PORT = 8766
+
+
+def build_scenarios(data, tokens, rng):
+    """
+    Each scenario maps to (request share, request factory).
+    """
+    admin = tokens["admin"]
+    parents = [(tokens[p], p) for p in data.ids["parent"][:200]]
+    teachers = [(tokens[t], t) for t in data.ids["teacher"]]
+    students = data.ids["student"]
+    faces = list(data.faces.items())
+
+    def auth(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def login():
+        user_id = rng.choice(data.ids["parent"])
+        return "POST", "/api/v1/auth/token", {
+            "data": {"username": data.emails[user_id], "password": "benchmark-password"}
+        }
+
+    def verify():
+        _, image = rng.choice(faces)
+        return "POST", "/api/v1/users/verify", {"files": {"file": ("face.jpg", image, "image/jpeg")}}
+
+    def today_parent():
+        token, _ = rng.choice(parents)
+        return "GET", "/api/v1/attendances/attendances/today", {"headers": auth(token)}
+
+    def today_teacher():
+        token, _ = rng.choice(teachers)
+        return "GET", "/api/v1/attendances/attendances/today/teacher", {"headers": auth(token)}
+
+    def child_history():
+        token, parent_id = rng.choice(parents)
+        child_id = rng.choice(data.children_of[parent_id])
+        return "GET", f"/api/v1/attendances/child/{child_id}/attendance", {"headers": auth(token)}
+
+    def list_users():
+        return "GET", f"/api/v1/users/users/?skip={rng.randrange(0, 1000)}&limit=100", {"headers": auth(admin)}
+
+    def get_user():
+        return "GET", f"/api/v1/users/users/{rng.choice(students)}", {"headers": auth(admin)}
+
+    def update_user():
+        user_id = rng.choice(students)
+        return "PUT", f"/api/v1/users/users/{user_id}", {
+            "headers": auth(admin),
+            "json": {"first_name": f"Renamed{user_id}", "last_name": None, "email": None,
+                     "role": None, "password": None},
+        }
+
+    def list_attendances():
+        return "GET", f"/api/v1/attendances/?skip={rng.randrange(0, 1000)}&limit=100", {"headers": auth(admin)}
+
+    def create_attendance():
+        return "POST", "/api/v1/attendances/", {
+            "headers": auth(admin),
+            "json": {"user_id": rng.choice(students), "time_in": datetime.now().isoformat()},
+        }
+
+    # Login pays for bcrypt, so it gets a smaller share of the requests
+    return {
+        "auth_token": (0.25, login),
+        "verify": (1.0, verify),
+        "attendances_today": (1.0, today_parent),
+        "attendances_today_teacher": (1.0, today_teacher),
+        "child_attendance": (1.0, child_history),
+        "users_list": (1.0, list_users),
+        "user_get": (1.0, get_user),
+        "user_update": (1.0, update_user),
+        "attendances_list": (1.0, list_attendances),
+        "attendance_create": (1.0, create_attendance),
+    }
+
+
+async def run_scenario(client, factory, requests: int, concurrency: int):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(factory())
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, url, kwargs = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": requests / elapsed,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+async def drive(scenarios, requests: int, concurrency: int):
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120) as client:
+        for name, (share, factory) in scenarios.items():
+            # Warm up connections and caches before measuring
+            await run_scenario(client, factory, min(concurrency, 20), concurrency)
+            results[name] = await run_scenario(client, factory, max(1, int(requests * share)), concurrency)
+    return results
+
+
+def compare(results, baselines, tolerance: float):
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if result["p95_ms"] > baseline["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f} ms vs baseline {baseline['p95_ms']:.1f} ms")
+        if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['throughput']:.0f} req/s vs baseline {baseline['throughput']:.0f} req/s")
+        if result["errors"] > baseline["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {baseline['errors']}")
+    return regressions
+
+
+def wait_ready(server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/health", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="scratch database to use instead of a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenario", action="append", help="run only these scenarios")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+        env = offline_env(url, VECTOR_STORE="local", FACE_GALLERY_PATH=os.path.join(tmp, "gallery"),
+                          LOG_LEVEL="WARNING")
+        os.environ.update(env)
+
+        from app.db.session import Base, SessionLocal, engine
+        from app.core.security import create_access_token
+        from benchmarks.seed import seed
+
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            data = seed(db, users=args.users, gallery_path=env["FACE_GALLERY_PATH"])
+            print(f"seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+        engine.dispose()
+
+        token_users = data.ids["parent"][:200] + data.ids["teacher"] + data.ids["admin"][:1]
+        tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in token_users}
+        tokens["admin"] = tokens[data.ids["admin"][0]]
+
+        scenarios = build_scenarios(data, tokens, random.Random(1))
+        if args.scenario:
+            scenarios = {name: scenarios[name] for name in args.scenario}
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.server", "--port", str(PORT)],
+            env=env,
+        )
+        try:
+            wait_ready(server)
+            results = asyncio.run(drive(scenarios, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'scenario':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['throughput']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}")
+
+    if args.save_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baselines = json.load(f)
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"baselines written to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nno regressions against baselines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Measure per-worker memory of the gunicorn launch mode (gunicorn.conf.py)
+with 1, 4 and 8 workers, with and without preload_app.
+
+Uses VECTOR_STORE=local with a synthetic gallery and SQLite, so no network is
+needed. RSS counts shared pages in full for every worker; PSS splits shared
+pages between the processes mapping them, so PSS is the number that shows
+whether workers really share the model and gallery.
+
+    python -m benchmarks.prefork_rss [--gallery-size 100000] [--with-model]
+
+--with-model also preloads Facenet512 (requires deepface and TensorFlow).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks.common import offline_env
+
+WORKER_COUNTS = (1, 4, 8)
+PORT = 8765
+
+
+def write_gallery(path: str, size: int):
+    from app.utils.vector_store import LocalVectorStore
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((size, 512), dtype=np.float32)
+    LocalVectorStore(path).write_many(
+        (f"user-{i}", embeddings[i], i) for i in range(size)
+    )
+
+
+def memory_kb(pid: int):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker_pids(master_pid: int):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_ready(master: subprocess.Popen, workers: int, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            if len(worker_pids(master.pid)) == workers:
+                # Hit every worker a few times so lazily mapped pages are touched
+                for _ in range(workers * 4):
+                    urllib.request.urlopen(f"http://127.0.0.1:{PORT}/health", timeout=5).read()
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError("gunicorn did not become ready")
+
+
+def measure(env: dict, workers: int, preload: bool):
+    env = dict(env, WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD=str(preload).lower())
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(master, workers)
+        time.sleep(1)
+        samples = [memory_kb(pid) for pid in worker_pids(master.pid)]
+        master_rss, master_pss = memory_kb(master.pid)
+    finally:
+        master.terminate()
+        master.wait(timeout=60)
+    rss = sum(s[0] for s in samples) / len(samples) / 1024
+    pss = sum(s[1] for s in samples) / len(samples) / 1024
+    total_pss = (sum(s[1] for s in samples) + master_pss) / 1024
+    return rss, pss, total_pss
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gallery-size", type=int, default=100_000)
+    parser.add_argument("--with-model", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'prefork.db')}"
+        env = offline_env(
+            url,
+            VECTOR_STORE="local",
+            FACE_GALLERY_PATH=os.path.join(tmp, "gallery"),
+            PRELOAD_FACE_MODEL=str(args.with_model).lower(),
+            PRELOAD_FACE_GALLERY="true",
+            BIND=f"127.0.0.1:{PORT}",
+        )
+        os.environ.update(env)
+        write_gallery(env["FACE_GALLERY_PATH"], args.gallery_size)
+
+        print(f"gallery: {args.gallery_size} x 512 float32 "
+              f"({args.gallery_size * 512 * 4 / 2**20:.0f} MB), model preloaded: {args.with_model}")
+        print(f"{'workers':>8}{'preload':>9}{'RSS/worker MB':>16}{'PSS/worker MB':>16}{'total PSS MB':>15}")
+        for workers in WORKER_COUNTS:
+            for preload in (False, True):
+                rss, pss, total = measure(env, workers, preload)
+                print(f"{workers:>8}{str(preload):>9}{rss:>16.0f}{pss:>16.0f}{total:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Replay a directory of images through the /verify face pipeline and print a
+stage-by-stage latency table:
+
+    python -m benchmarks.profile_face_pipeline path/to/images [--query] [--lookup]
+
+Stages: image_write, decode, detect, embed, plus vector_query with --query
+(against the configured VECTOR_STORE) and user_lookup with --lookup (against
+the configured database). Uses the real DeepFace model unless --stub is given.
+"""
+import argparse
+import os
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+from app.core.metrics import timed
+from app.utils import face
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def replay(path: str, query: bool, lookup: bool, db=None):
+    from app.models.user import User
+    from app.utils.vector_store import get_vector_store
+
+    timings = {}
+    with open(path, "rb") as f:
+        data = f.read()
+    with timed("image_write", timings):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+            temp_file.write(data)
+            temp_file_path = temp_file.name
+    try:
+        embedding = np.asarray(face.embed_image_file(temp_file_path, timings))
+    finally:
+        os.unlink(temp_file_path)
+
+    matches = []
+    if query:
+        with timed("vector_query", timings):
+            matches = get_vector_store().query((embedding / np.linalg.norm(embedding)).tolist(), top_k=10)
+    if lookup and matches:
+        with timed("user_lookup", timings):
+            db.query(User).filter(User.id == matches[0].user_id).first()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--query", action="store_true", help="include the vector store query")
+    parser.add_argument("--lookup", action="store_true", help="include the user lookup (implies --query)")
+    parser.add_argument("--stub", action="store_true", help="use the offline stub model")
+    parser.add_argument("--warmup", type=int, default=1, help="images to run before measuring")
+    args = parser.parse_args()
+
+    if args.stub:
+        from benchmarks import fakes
+        fakes.install()
+
+    paths = sorted(
+        os.path.join(args.directory, name) for name in os.listdir(args.directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        parser.error(f"no images in {args.directory}")
+
+    db = None
+    if args.lookup:
+        from app.db.session import SessionLocal
+        db = SessionLocal()
+
+    samples = defaultdict(list)
+    failures = 0
+    try:
+        for index, path in enumerate(paths[:args.warmup] + paths):
+            try:
+                timings = replay(path, args.query or args.lookup, args.lookup, db)
+            except Exception as e:
+                failures += 1
+                print(f"{os.path.basename(path)}: {e}")
+                continue
+            if index >= args.warmup:
+                for stage, seconds in timings.items():
+                    samples[stage].append(seconds * 1000)
+    finally:
+        if db is not None:
+            db.close()
+
+    print(f"\n{len(paths)} images, {failures} failed\n")
+    print(f"{'stage':<14}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'share':>8}")
+    total = sum(sum(values) for values in samples.values())
+    for stage, values in samples.items():
+        values = np.asarray(values)
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{stage:<14}{len(values):>6}{values.mean():>10.2f}{p50:>10.2f}{p95:>10.2f}"
+              f"{values.max():>10.2f}{values.sum() / total:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
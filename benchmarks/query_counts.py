@@ -0,0 +1,362 @@
+"""
+Query-count regression check for every endpoint under app/api/v1.
+
+Seeds a small and a large fixture (more users, longer attendance history,
+and a teacher, parent and bulk imports with more rows), calls every route
+once per fixture in-process with the offline face model, and records the
+SQL statements each request issues through SQLAlchemy engine events.
+Fails (exit 1) when a route issues more statements on the large fixture
+than on the small one (an N+1 or lazy load), exceeds its budget in
+query_budgets.json, errors, or has no scenario here:
+
+    python -m benchmarks.query_counts                  # check against the budgets
+    python -m benchmarks.query_counts --save-budgets   # record the current counts as budgets
+    python -m benchmarks.query_counts --show-sql "GET /api/v1/users/users/"
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.common import offline_env
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "query_budgets.json")
+
+# Fixture sizes; fanout is the number of rows behind the measured teacher,
+# parent and bulk requests
+SIZES = {
+    "small": {"users": 300, "history_days": 3, "fanout": 25},
+    "large": {"users": 3000, "history_days": 30, "fanout": 200},
+}
+
+# Routes that can't be measured per request, with the reason
+SKIPPED = {
+    "GET /api/v1/attendances/stream": "server-sent events; the response never finishes",
+}
+
+
+class StatementRecorder:
+    """
+    Collects the SQL statements executed on an engine while recording.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = None
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is not None:
+            self.statements.append(" ".join(statement.split()))
+
+    @contextmanager
+    def recording(self):
+        self.statements = []
+        try:
+            yield self.statements
+        finally:
+            self.statements = None
+
+
+@dataclass
+class Fixture:
+    data: object
+    tokens: Dict[int, str]
+    teacher_id: int
+    parent_id: int
+    fanout: int
+    counter: itertools.count = field(default_factory=lambda: itertools.count(1))
+
+    def auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    @property
+    def admin(self) -> dict:
+        return self.auth(self.data.ids["admin"][0])
+
+    @property
+    def teacher(self) -> dict:
+        return self.auth(self.teacher_id)
+
+    @property
+    def parent(self) -> dict:
+        return self.auth(self.parent_id)
+
+    @property
+    def student_id(self) -> int:
+        return self.data.students_of[self.teacher_id][0]
+
+    @property
+    def face(self):
+        return next(iter(self.data.faces.values()))
+
+    def new_email(self) -> str:
+        return f"new{next(self.counter)}@school.example"
+
+    def new_users(self, count: int, role) -> List[int]:
+        from app.db.session import SessionLocal
+        from app.models import User
+
+        with SessionLocal() as db:
+            users = [User(first_name="New", last_name="User", email=self.new_email(),
+                          hashed_password="x", role=role) for _ in range(count)]
+            db.add_all(users)
+            db.commit()
+            return [user.id for user in users]
+
+    def new_attendance(self) -> int:
+        from app.db.session import SessionLocal
+        from app.models import Attendance
+        from app.models.user import RoleEnum
+
+        user_id = self.new_users(1, RoleEnum.student)[0]
+        now = datetime.now()
+        with SessionLocal() as db:
+            attendance = Attendance(user_id=user_id, day=now.date(), time_in=now)
+            db.add(attendance)
+            db.commit()
+            return attendance.id
+
+
+def build_scenarios(fx: Fixture) -> dict:
+    """
+    Route ("METHOD path template") -> factory returning (method, url, request kwargs).
+    Factories may create rows they need first; that isn't counted.
+    """
+    from app.crud.enrollment_job import create_enrollment_job
+    from app.db.session import SessionLocal
+    from app.models.user import RoleEnum
+
+    students = fx.data.ids["student"]
+    rows = fx.fanout
+
+    def new_user_json():
+        return {"first_name": "New", "last_name": "User", "email": fx.new_email(),
+                "role": "student", "password": "benchmark-password"}
+
+    def enrollment_job():
+        with SessionLocal() as db:
+            job = create_enrollment_job(db, fx.student_id, fx.face)
+        return "GET", f"/api/v1/users/enrollment-jobs/{job.id}", {"headers": fx.admin}
+
+    def delete_user():
+        user_id = fx.new_users(1, RoleEnum.student)[0]
+        return "DELETE", f"/api/v1/users/users/{user_id}", {"headers": fx.admin}
+
+    def bulk_delete():
+        return "POST", "/api/v1/users/users/bulk-delete", {
+            "headers": fx.admin, "json": {"user_ids": fx.new_users(rows, RoleEnum.student)},
+        }
+
+    def delete_attendance():
+        return "DELETE", f"/api/v1/attendances/{fx.new_attendance()}", {"headers": fx.admin}
+
+    parents = fx.data.ids["parent"]
+    teachers = fx.data.ids["teacher"]
+    return {
+        "POST /api/v1/auth/register": lambda: ("POST", "/api/v1/auth/register", {"json": new_user_json()}),
+        "POST /api/v1/auth/token": lambda: ("POST", "/api/v1/auth/token", {
+            "data": {"username": fx.data.emails[fx.parent_id], "password": "benchmark-password"}}),
+        "GET /api/v1/users/me": lambda: ("GET", "/api/v1/users/me", {"headers": fx.parent}),
+        "POST /api/v1/users/verify": lambda: ("POST", "/api/v1/users/verify", {
+            "files": {"file": ("face.jpg", fx.face, "image/jpeg")}}),
+        "POST /api/v1/users/verify/group": lambda: ("POST", "/api/v1/users/verify/group", {
+            "headers": fx.teacher, "files": {"file": ("class.jpg", fx.face, "image/jpeg")}}),
+        "WS /api/v1/users/verify/stream": lambda: (
+            "WS", f"/api/v1/users/verify/stream?teacher_id={fx.teacher_id}", {"frames": [fx.face]}),
+        "POST /api/v1/users/users/{user_id}/upload-image": lambda: (
+            "POST", f"/api/v1/users/users/{fx.student_id}/upload-image", {
+                "headers": fx.admin, "files": {"file": ("face.jpg", fx.face, "image/jpeg")}}),
+        "GET /api/v1/users/enrollment-jobs/{job_id}": enrollment_job,
+        "POST /api/v1/users/users/": lambda: ("POST", "/api/v1/users/users/", {"json": new_user_json()}),
+        "POST /api/v1/users/users/bulk": lambda: ("POST", "/api/v1/users/users/bulk", {
+            "headers": fx.admin, "json": [new_user_json() for _ in range(max(1, rows // 10))]}),
+        "GET /api/v1/users/users/": lambda: ("GET", "/api/v1/users/users/?limit=100", {"headers": fx.admin}),
+        "GET /api/v1/users/users/search": lambda: (
+            "GET", "/api/v1/users/users/search?q=first1&limit=20", {"headers": fx.admin}),
+        "GET /api/v1/users/users/{user_id}": lambda: (
+            "GET", f"/api/v1/users/users/{fx.student_id}", {"headers": fx.admin}),
+        "PUT /api/v1/users/users/{user_id}": lambda: ("PUT", f"/api/v1/users/users/{fx.student_id}", {
+            "headers": fx.admin,
+            "json": {"first_name": "Renamed", "last_name": None, "email": None, "role": None, "password": None}}),
+        "DELETE /api/v1/users/users/{user_id}": delete_user,
+        "POST /api/v1/users/users/bulk-delete": bulk_delete,
+        "GET /api/v1/attendances/attendances/today/teacher": lambda: (
+            "GET", "/api/v1/attendances/attendances/today/teacher", {"headers": fx.teacher}),
+        "GET /api/v1/attendances/attendances/today": lambda: (
+            "GET", "/api/v1/attendances/attendances/today", {"headers": fx.parent}),
+        "GET /api/v1/attendances/child/{child_id}/attendance": lambda: (
+            "GET", f"/api/v1/attendances/child/{fx.data.children_of[fx.parent_id][0]}/attendance",
+            {"headers": fx.parent}),
+        "GET /api/v1/attendances/student/{student_id}/attendance": lambda: (
+            "GET", f"/api/v1/attendances/student/{fx.student_id}/attendance", {"headers": fx.teacher}),
+        "POST /api/v1/attendances/": lambda: ("POST", "/api/v1/attendances/", {
+            "headers": fx.admin,
+            "json": {"user_id": fx.new_users(1, RoleEnum.student)[0], "time_in": datetime.now().isoformat()}}),
+        "GET /api/v1/attendances/": lambda: ("GET", "/api/v1/attendances/?limit=100", {"headers": fx.admin}),
+        "GET /api/v1/attendances/{attendance_id}": lambda: (
+            "GET", f"/api/v1/attendances/{fx.new_attendance()}", {"headers": fx.admin}),
+        "PUT /api/v1/attendances/{attendance_id}": lambda: ("PUT", f"/api/v1/attendances/{fx.new_attendance()}", {
+            "headers": fx.admin, "json": {"time_out": (datetime.now() + timedelta(hours=1)).isoformat()}}),
+        "DELETE /api/v1/attendances/{attendance_id}": delete_attendance,
+        "POST /api/v1/relationships/add-parent-child": lambda: (
+            "POST", f"/api/v1/relationships/add-parent-child?parent_id={parents[-1]}&child_id={students[-1]}",
+            {"headers": fx.admin}),
+        "POST /api/v1/relationships/add-teacher-student": lambda: (
+            "POST", f"/api/v1/relationships/add-teacher-student?teacher_id={teachers[-1]}&student_id={students[0]}",
+            {"headers": fx.admin}),
+        "POST /api/v1/relationships/parent-child/bulk": lambda: ("POST", "/api/v1/relationships/parent-child/bulk", {
+            "headers": fx.admin,
+            "json": [{"parent_id": parents[-2], "child_id": child} for child in students[-rows:]]}),
+        "POST /api/v1/relationships/teacher-student/bulk": lambda: (
+            "POST", "/api/v1/relationships/teacher-student/bulk", {
+                "headers": fx.admin,
+                "json": [{"teacher_id": teachers[-2], "student_id": student} for student in students[-rows:]]}),
+    }
+
+
+def api_routes(app) -> List[str]:
+    routes = []
+    for route in app.routes:
+        if not route.path.startswith("/api/v1/"):
+            continue
+        methods = getattr(route, "methods", None) or {"WS"}
+        routes.extend(f"{method} {route.path}" for method in sorted(methods))
+    return routes
+
+
+def build_fixture(size: dict, gallery_path: str) -> Fixture:
+    from sqlalchemy import insert
+
+    from app.core.security import create_access_token
+    from app.db.session import Base, SessionLocal, engine
+    from app.models import ParentChild, TeacherStudent
+    from benchmarks.seed import seed
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    shutil.rmtree(gallery_path, ignore_errors=True)
+    with SessionLocal() as db:
+        data = seed(db, users=size["users"], history_days=size["history_days"], enrolled=20,
+                    gallery_path=gallery_path)
+        # Give the measured teacher and parent `fanout` students / children, so
+        # per-student queries show up as growth between the fixtures
+        teacher_id, parent_id = data.ids["teacher"][0], data.ids["parent"][0]
+        extra_students = [s for s in data.ids["student"] if s not in data.students_of[teacher_id]]
+        extra_students = extra_students[:max(0, size["fanout"] - len(data.students_of[teacher_id]))]
+        if extra_students:
+            db.execute(insert(TeacherStudent), [{"teacher_id": teacher_id, "student_id": s} for s in extra_students])
+        data.students_of[teacher_id] += extra_students
+        extra_children = [s for s in data.ids["student"] if s not in data.children_of[parent_id]]
+        extra_children = extra_children[:max(0, size["fanout"] // 4 - len(data.children_of[parent_id]))]
+        if extra_children:
+            db.execute(insert(ParentChild), [{"parent_id": parent_id, "child_id": s} for s in extra_children])
+        data.children_of[parent_id] += extra_children
+        db.commit()
+
+    token_users = [teacher_id, parent_id, data.ids["admin"][0]]
+    tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in token_users}
+    return Fixture(data, tokens, teacher_id, parent_id, size["fanout"])
+
+
+def measure(client, recorder: StatementRecorder, factory):
+    method, url, kwargs = factory()
+    with recorder.recording() as statements:
+        if method == "WS":
+            with client.websocket_connect(url) as websocket:
+                websocket.receive_json()  # the initial pace
+                for frame in kwargs["frames"]:
+                    websocket.send_bytes(frame)
+                    websocket.receive_json()
+            status = 200
+        else:
+            status = client.request(method, url, **kwargs).status_code
+    return status, list(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budgets", default=BUDGET_PATH)
+    parser.add_argument("--save-budgets", action="store_true")
+    parser.add_argument("--show-sql", action="append", default=[], metavar="ROUTE",
+                        help='print the statements of a route, e.g. "GET /api/v1/users/me"; repeatable')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gallery_path = os.path.join(tmp, "gallery")
+        os.environ.update(offline_env(
+            f"sqlite:///{os.path.join(tmp, 'query_counts.db')}", VECTOR_STORE="local",
+            FACE_GALLERY_PATH=gallery_path, LOG_LEVEL="WARNING",
+            # Counted per request: no background enrollment, no answers from the debounce cache
+            ENROLLMENT_WORKERS=0, ATTENDANCE_DEBOUNCE_SECONDS=0,
+        ))
+        from fastapi.testclient import TestClient
+
+        from benchmarks import fakes
+        fakes.install()
+        from app.db.session import engine
+        from app.main import app
+
+        recorder = StatementRecorder(engine)
+        counts = {}
+        sql = {}
+        failures = []
+        with TestClient(app) as client:
+            for size_name, size in SIZES.items():
+                fixture = build_fixture(size, gallery_path)
+                for route, factory in build_scenarios(fixture).items():
+                    status, statements = measure(client, recorder, factory)
+                    if status >= 400:
+                        failures.append(f"{route}: HTTP {status} on the {size_name} fixture")
+                    counts.setdefault(route, {})[size_name] = len(statements)
+                    sql.setdefault(route, {})[size_name] = statements
+
+        scenarios = set(counts)
+        for route in api_routes(app):
+            if route not in scenarios and route not in SKIPPED:
+                failures.append(f"{route}: no scenario in benchmarks/query_counts.py")
+
+    budgets = {}
+    if os.path.exists(args.budgets):
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+
+    print(f"{'route':<60}" + "".join(f"{name:>8}" for name in SIZES) + f"{'budget':>8}")
+    for route, by_size in sorted(counts.items()):
+        print(f"{route:<60}" + "".join(f"{by_size[name]:>8}" for name in SIZES) + f"{budgets.get(route, '-'):>8}")
+        smallest, largest = by_size[next(iter(SIZES))], by_size[list(SIZES)[-1]]
+        if largest > smallest:
+            failures.append(f"{route}: {smallest} -> {largest} statements as the data grows (N+1?)")
+        if not args.save_budgets and route in budgets and largest > budgets[route]:
+            failures.append(f"{route}: {largest} statements, budget {budgets[route]}")
+    for route, reason in SKIPPED.items():
+        print(f"{route:<60}  skipped: {reason}")
+
+    for route in args.show_sql:
+        for size_name, statements in sql.get(route, {}).items():
+            print(f"\n{route} ({size_name}):")
+            for statement in statements:
+                print(f"  {statement}")
+
+    if args.save_budgets:
+        with open(args.budgets, "w") as f:
+            json.dump({route: by_size[list(SIZES)[-1]] for route, by_size in counts.items()}, f,
+                      indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbudgets written to {args.budgets}")
+    if failures:
+        print("\nfailures:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nall routes within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Seed a database with a realistic school: users in every role, parent-child
+and teacher-student links, attendance history and enrolled faces.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert
+
+from app.core.security import get_password_hash
+from app.models import User, Attendance, ParentChild, TeacherStudent, UserEmbedding
+from app.models.user import RoleEnum
+from app.utils.vector_store import LocalVectorStore
+from benchmarks.fakes import fake_image, stub_embedding
+
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class SeededData:
+    ids: Dict[str, List[int]] = field(default_factory=dict)
+    emails: Dict[int, str] = field(default_factory=dict)
+    children_of: Dict[int, List[int]] = field(default_factory=dict)
+    students_of: Dict[int, List[int]] = field(default_factory=dict)
+    # student id -> JPEG bytes whose embedding is enrolled in the gallery
+    faces: Dict[int, bytes] = field(default_factory=dict)
+
+
+def seed(db, users: int = 5000, history_days: int = 20, enrolled: int = 200,
+         gallery_path: str = None, rng_seed: int = 0) -> SeededData:
+    rng = random.Random(rng_seed)
+    data = SeededData()
+    hashed_password = get_password_hash(PASSWORD)
+
+    # Role mix of a typical school
+    counts = {
+        RoleEnum.admin: max(1, users // 100),
+        RoleEnum.teacher: max(1, users * 3 // 100),
+        RoleEnum.parent: users * 30 // 100,
+    }
+    counts[RoleEnum.student] = users - sum(counts.values())
+
+    rows = []
+    next_id = 1
+    for role, count in counts.items():
+        data.ids[role.value] = list(range(next_id, next_id + count))
+        for user_id in data.ids[role.value]:
+            email = f"{role.value}{user_id}@school.example"
+            data.emails[user_id] = email
+            rows.append({
+                "id": user_id,
+                "first_name": f"First{user_id}",
+                "last_name": f"Last{user_id}",
+                "email": email,
+                "hashed_password": hashed_password,
+                "role": role,
+            })
+        next_id += count
+    db.execute(insert(User), rows)
+
+    students = data.ids["student"]
+    parent_links = []
+    for parent_id in data.ids["parent"]:
+        children = rng.sample(students, k=min(len(students), rng.choice((1, 1, 2, 3))))
+        data.children_of[parent_id] = children
+        parent_links.extend({"parent_id": parent_id, "child_id": child} for child in children)
+    if parent_links:
+        db.execute(insert(ParentChild), parent_links)
+
+    teacher_links = []
+    teachers = data.ids["teacher"]
+    for index, student_id in enumerate(students):
+        teacher_id = teachers[index % len(teachers)]
+        data.students_of.setdefault(teacher_id, []).append(student_id)
+        teacher_links.append({"teacher_id": teacher_id, "student_id": student_id})
+    db.execute(insert(TeacherStudent), teacher_links)
+
+    # Attendance history, with most students already checked in today
+    today = datetime.now().date()
+    attendances = []
+    for day in range(history_days, -1, -1):
+        date = today - timedelta(days=day)
+        for student_id in students:
+            if rng.random() < 0.85:
+                time_in = datetime.combine(date, time(7, 30)) + timedelta(minutes=rng.randint(0, 60))
+                time_out = time_in + timedelta(hours=7) if day else None
+                attendances.append({"user_id": student_id, "day": date, "time_in": time_in, "time_out": time_out})
+    db.execute(insert(Attendance), attendances)
+
+    # Enrolled faces
+    if gallery_path:
+        gallery = []
+        embeddings = []
+        for student_id in students[:enrolled]:
+            image = fake_image(student_id)
+            data.faces[student_id] = image
+            gallery.append((f"user-{student_id}", stub_embedding(image), student_id))
+            embeddings.append({"user_id": student_id, "vector_id": f"user-{student_id}"})
+        LocalVectorStore(gallery_path).write_many(gallery)
+        if embeddings:
+            db.execute(insert(UserEmbedding), embeddings)
+
+    db.commit()
+    return data
@@ -0,0 +1,124 @@
+"""
+Compare the ORM + response_model + stdlib JSON path against the column-tuple +
+orjson path used by the list endpoints, for 1k and 10k row pages.
+
+Runs against an in-memory SQLite database, so no network is needed:
+
+    python -m benchmarks.serialization
+"""
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from benchmarks.common import offline_env
+
+os.environ.update(offline_env("sqlite://"))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models import User, Attendance
+from app.models.user import RoleEnum
+from app.schemas import UserOut, AttendanceOut
+from app.crud.user import get_users, get_user_rows
+from app.crud.attendance import get_attendances, get_attendance_rows
+
+SIZES = (1_000, 10_000)
+REPEAT = 5
+
+users_adapter = TypeAdapter(List[UserOut])
+attendances_adapter = TypeAdapter(List[AttendanceOut])
+
+
+def seed(db, size: int):
+    roles = list(RoleEnum)
+    db.bulk_insert_mappings(User, [
+        {
+            "id": i,
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"user{i}@example.com",
+            "hashed_password": "$2b$12$" + "x" * 53,
+            "role": roles[i % len(roles)],
+        }
+        for i in range(1, size + 1)
+    ])
+    start = datetime(2025, 1, 1, 8, 0)
+    db.bulk_insert_mappings(Attendance, [
+        {
+            "id": i,
+            "user_id": i,
+            "day": (start + timedelta(minutes=i)).date(),
+            "time_in": start + timedelta(minutes=i),
+            "time_out": start + timedelta(hours=8, minutes=i),
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(1, size + 1)
+    ])
+    db.commit()
+
+
+def orm_path(db, size, fetch, adapter):
+    # What FastAPI does for a response_model: validate, dump to JSON types, json.dumps
+    objects = fetch(db, skip=0, limit=size)
+    validated = adapter.validate_python(objects, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def rows_path(db, size, fetch):
+    return orjson.dumps(fetch(db, skip=0, limit=size))
+
+
+def measure(fn):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings) * 1000, peak / 1024
+
+
+def main():
+    print(f"{'endpoint':<12}{'rows':>8}{'path':>8}{'best ms':>12}{'peak KiB':>12}")
+    for size in SIZES:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, size)
+
+        cases = {
+            "users": (
+                lambda: orm_path(db, size, get_users, users_adapter),
+                lambda: rows_path(db, size, get_user_rows),
+            ),
+            "attendances": (
+                lambda: orm_path(db, size, get_attendances, attendances_adapter),
+                lambda: rows_path(db, size, get_attendance_rows),
+            ),
+        }
+        for name, (old, new) in cases.items():
+            for label, fn in (("orm", old), ("rows", new)):
+                # Fresh identity map each run so the ORM path pays for entity loading
+                db.expunge_all()
+                elapsed, peak = measure(lambda: (db.expunge_all(), fn()))
+                print(f"{name:<12}{size:>8}{label:>8}{elapsed:>12.2f}{peak:>12.0f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Serve the app with the offline face model stub installed, for load tests:
+
+    python -m benchmarks.server --port 8766
+"""
+import argparse
+
+import uvicorn
+
+from benchmarks import fakes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    fakes.install()
+    from app.main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure worker cold start: time to import app.main and resulting RSS, with
+the ML stack left lazy versus loaded eagerly as app.main used to do.
+
+Each variant runs in a fresh interpreter against a throwaway SQLite file,
+so no network is needed (Pinecone is never contacted in either variant):
+
+    python -m benchmarks.startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import offline_env
+
+RUNS = 3
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+if sys.argv[1] == "eager":
+    from app.utils import face
+    face.get_deepface()
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024, "modules": len(sys.modules)}))
+"""
+
+
+def run(variant: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, variant],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        env = offline_env(url)
+
+        print(f"{'variant':<8}{'import s':>10}{'RSS MB':>10}{'modules':>10}")
+        for variant in ("lazy", "eager"):
+            try:
+                results = [run(variant, env) for _ in range(RUNS)]
+            except subprocess.CalledProcessError as e:
+                print(f"{variant:<8} failed: {e.stderr.strip().splitlines()[-1]}")
+                continue
+            best = min(results, key=lambda r: r["seconds"])
+            print(f"{variant:<8}{best['seconds']:>10.2f}{best['rss_mb']:>10.0f}{best['modules']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Multi-worker launch mode:
+#
+#   PRELOAD_FACE_MODEL=true PRELOAD_FACE_GALLERY=true gunicorn -c gunicorn.conf.py app.main:app
+#
+# With preload_app the master imports app.main once, which builds the
+# Facenet512 model and maps the face gallery before any worker is forked. Workers then share those pages copy-on-write
+# instead of each loading their own copy. With VECTOR_STORE=local the gallery
+# is a memory-mapped file, so its pages stay shared even after the master
+# remaps it.
+import gc
+import os
+import tempfile
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+# Read back by the workers to split the CPUs between their password hash pools
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = 120
+
+# Metrics from every worker are aggregated by /metrics; must be set before
+# prometheus_client is imported, i.e. before the app is preloaded
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers don't touch (and so copy) the preloaded objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections opened by the master during preload must not be shared
+    from app.db.session import engine
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)